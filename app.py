@@ -1,9 +1,18 @@
 import streamlit as st
 import json
-from runnable import get_runnable
+from dotenv import load_dotenv
+
+# Before the agent modules read their settings
+load_dotenv()
+
+from config import SYSTEM_MESSAGE
+from execution import SessionBusy, get_execution_service
+from file_cache import file_cache
+from tracing import metrics, start_metrics_server
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage
 import time
 import re
+import uuid
 
 # Create a more descriptive title and sidebar
 st.set_page_config(
@@ -13,7 +22,8 @@ st.set_page_config(
 
 @st.cache_resource
 def create_agent_instance():
-    return get_runnable()
+    start_metrics_server()
+    return get_execution_service()
 
 
 def extract_code_blocks(content):
@@ -45,9 +55,83 @@ def prettify_message(content):
     return content
 
 
+def render_job(job, status, placeholder):
+    """Render a run's progress events (replayed from the start after a rerun)
+    until it finishes, and return its final state"""
+    streamed = ""
+    for chunk in job.subscribe():
+        event = chunk.get("event")
+        if event == "llm_start" and streamed:
+            streamed += "\n\n"
+        elif event == "token":
+            streamed += chunk["text"]
+            placeholder.markdown(streamed + "▌")
+        elif event == "tool_start":
+            status.update(label=f"Running {chunk['name']}...")
+            status.write(f"🔧 {chunk['name']} {', '.join(chunk['paths'])}")
+        elif event == "tool_end":
+            status.write(f"✅ {chunk['name']} finished")
+        elif event == "file_edit":
+            status.write(f"📝 Edited `{chunk['path']}` ({chunk['size']} chars)")
+    return job.result or {"messages": []}
+
+
+def show_job(job):
+    """Stream a run into an assistant message and record its answer"""
+    with st.chat_message("assistant", avatar="🤖"):
+        status = st.status("Thinking and coding...", expanded=False)
+        placeholder = st.empty()
+        response = render_job(job, status, placeholder)
+
+        # Process AI messages
+        ai_messages = [
+            msg for msg in response["messages"] if isinstance(msg, AIMessage)
+        ]
+        if job.error:
+            ai_message = AIMessage(content=f"The run failed: {job.error}")
+        elif ai_messages:
+            ai_message = ai_messages[-1]
+        else:
+            ai_message = AIMessage(content="(No response generated)")
+
+        # Display the response
+        status.update(label="Done", state="error" if job.error else "complete")
+        placeholder.markdown(prettify_message(ai_message.content))
+
+    st.session_state.display_messages.append(ai_message)
+    st.session_state.pending_job = None
+
+
+def display_history(messages):
+    """The user's messages and the final answer of each turn"""
+    shown = []
+    answer = None
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            if answer is not None:
+                shown.append(answer)
+                answer = None
+            shown.append(message)
+        elif isinstance(message, AIMessage):
+            answer = message
+    if answer is not None:
+        shown.append(answer)
+    return shown
+
+
 def main():
-    # Initialize the agent
-    agent = create_agent_instance()
+    # Runs execute on the shared service's worker pool, each session has its
+    # own conversation and queue there
+    service = create_agent_instance()
+
+    # System message
+    system_message = SYSTEM_MESSAGE
+
+    # The session id lives in the URL so a refresh or a server restart picks
+    # the conversation up again from its checkpoints
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.session_id
 
     # Sidebar for configuration and project info
     with st.sidebar:
@@ -73,30 +157,45 @@ def main():
         """
         )
 
+        st.subheader("Performance")
+        stats = file_cache.stats()
+        st.caption(
+            f"File cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['entries']} files, {stats['bytes'] // 1024} / "
+            f"{stats['max_bytes'] // 1024} KiB"
+        )
+        load = service.stats()
+        st.caption(
+            f"Agent runs: {load['running']} running, {load['queued']} queued, "
+            f"{load['sessions']} sessions"
+        )
+        counters = metrics.session(st.session_state.session_id)
+        if counters:
+            st.caption(
+                "Session: "
+                + ", ".join(f"{int(v)} {k}" for k, v in sorted(counters.items()))
+            )
+
         if st.button("Clear Chat History"):
-            st.session_state.messages = [SystemMessage(content=system_message)]
+            service.reset(st.session_state.session_id, system_message)
             st.session_state.display_messages = []
+            st.session_state.pending_job = None
             st.rerun()
 
     # Main content area
     st.title("CodeHelper AI Assistant")
 
-    # System message
-    system_message = """
-    You are a coding assistant who must **always** use available tools to edit and modify code. 
-    Always use builder_tool for coding related tasks.
-    Your tech stack is only: Next.js 15 with app router, backend in API routes, DaisyUI for UI framework.
-    
-    Before making changes, analyze the current code structure to maintain consistency.
-    Provide step-by-step explanations of what you're doing and why.
-    """
-
     # Initialize session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = [SystemMessage(content=system_message)]
-
     if "display_messages" not in st.session_state:
-        st.session_state.display_messages = []
+        st.session_state.display_messages = display_history(
+            service.history(st.session_state.session_id, system_message)
+        )
+    if "pending_job" not in st.session_state:
+        active = service.active_job(st.session_state.session_id)
+        if active is None:
+            # A run cut short by a restart continues from its last step
+            active = service.resume(st.session_state.session_id, system_message)
+        st.session_state.pending_job = active.id if active else None
 
     # Display chat messages from history
     for message in st.session_state.display_messages:
@@ -107,6 +206,15 @@ def main():
             with st.chat_message("user", avatar="👤"):
                 st.markdown(message.content)
 
+    # A rerun interrupted the display of a run, it kept going on the worker
+    pending = st.session_state.pending_job
+    if pending:
+        job = service.job(st.session_state.session_id, pending)
+        if job is None:
+            st.session_state.pending_job = None
+        else:
+            show_job(job)
+
     # Input area
     prompt = st.chat_input("What would you like to do with your code?")
     if prompt:
@@ -114,34 +222,17 @@ def main():
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)
 
-        # Add to both actual messages (for agent) and display messages (for UI)
-        user_message = HumanMessage(content=prompt)
-        st.session_state.messages.append(user_message)
-        st.session_state.display_messages.append(user_message)
-
-        # Get AI response with spinner
-        with st.spinner("Thinking and coding..."):
-            response = agent.invoke(
-                input={"messages": st.session_state.messages},
-            )
-
-        # Process AI messages
-        ai_messages = [
-            msg for msg in response["messages"] if isinstance(msg, AIMessage)
-        ]
-        ai_message = (
-            ai_messages[-1]
-            if ai_messages
-            else AIMessage(content="(No response generated)")
-        )
-
-        # Display the response
-        with st.chat_message("assistant", avatar="🤖"):
-            st.markdown(prettify_message(ai_message.content))
-
-        # Update session state
-        st.session_state.messages.extend(response["messages"])
-        st.session_state.display_messages.append(ai_message)
+        try:
+            job = service.submit(st.session_state.session_id, prompt, system_message)
+        except SessionBusy as e:
+            st.warning(f"Too many requests waiting, try again shortly. ({e})")
+            return
+        st.session_state.display_messages.append(HumanMessage(content=prompt))
+        st.session_state.pending_job = job.id
+
+        # Stream the run: tokens, tool calls and file edits render as they
+        # happen, the conversation itself is kept by the service
+        show_job(job)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from deltas import content_hash
+
+ARTIFACT_STORE_BYTES = int(os.getenv("ARTIFACT_STORE_BYTES", str(64 * 1024 * 1024)))
+
+
+class FileVersion(NamedTuple):
+    path: str
+    hash: str  # deltas.content_hash of the content in the artifact store
+    size: int
+
+
+class BuildArtifact(NamedTuple):
+    """What a builder run read and changed, carried as ToolMessage.artifact"""
+
+    files: List[FileVersion]
+    edited: List[str]
+
+    def summary(self) -> str:
+        """Compact text for the model, no file bodies"""
+        if not self.files:
+            return "No files were read or changed."
+        edited = set(self.edited)
+        lines = [
+            f"- {version.path} [{version.hash}] "
+            f"{'edited' if version.path in edited else 'read'}, {version.size} chars"
+            for version in self.files
+        ]
+        return f"Builder touched {len(self.files)} files:\n" + "\n".join(lines)
+
+
+class ArtifactStore:
+    """Process-wide content-addressed blobs shared between tools and nodes,
+    LRU-bounded in bytes"""
+
+    def __init__(self, max_bytes: int = ARTIFACT_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self._blobs: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, content: str) -> str:
+        digest = content_hash(content)
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return digest
+            self._blobs[digest] = content
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes and len(self._blobs) > 1:
+                _, old = self._blobs.popitem(last=False)
+                self._bytes -= len(old)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            content = self._blobs.get(digest)
+            if content is not None:
+                self._blobs.move_to_end(digest)
+            return content
+
+    def version(self, path: str, content: str) -> FileVersion:
+        return FileVersion(path, self.put(content), len(content))
+
+    def contents(self, versions: List[FileVersion]) -> Dict[str, str]:
+        """path -> content for the versions still held by the store"""
+        found = {}
+        for version in versions:
+            content = self.get(version.hash)
+            if content is not None:
+                found[version.path] = content
+        return found
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,293 @@
+"""Headless batch runner: send every request of a JSONL file to the agent.
+
+Each worker process gets its own copy of the project, restored to the
+original after every request, so requests never see each other's edits:
+
+    python batch.py requests.jsonl --project user_project --concurrency 8
+
+Results are appended to the output JSONL as requests finish, then
+throughput, latency percentiles and failures are printed. --scripted swaps
+the chat model for the offline one from benchmarks/ (no API key needed).
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from walker import IGNORED
+
+DEFAULT_WORKDIR = os.path.join(".cache", "batch")
+
+_worker: Dict[str, Any] = {}
+
+
+def iter_requests(path: str) -> Iterator[Dict[str, Any]]:
+    """Requests of a JSONL file, read lazily: {"id", "prompt", ...}"""
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            prompt = item.get("prompt") or item.get("body") or item.get("title")
+            if not prompt:
+                continue
+            yield {
+                "id": item.get("request_id") or item.get("id") or f"line-{number}",
+                "title": item.get("title"),
+                "prompt": prompt,
+            }
+
+
+def _ignore(directory: str, names: List[str]) -> List[str]:
+    return [name for name in names if name in IGNORED]
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _files(
+    root: str, folders: Optional[Set[str]] = None
+) -> Dict[str, Tuple[int, int]]:
+    """Files below `root` by relative path, sub-directories go to `folders`"""
+    found = {}
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in IGNORED]
+        if folders is not None:
+            rel = os.path.relpath(directory, root)
+            folders.update(os.path.join(rel, d) if rel != "." else d for d in dirs)
+        for name in names:
+            path = os.path.join(directory, name)
+            signature = _signature(path)
+            if signature is not None:
+                found[os.path.relpath(path, root)] = signature
+    return found
+
+
+def restore(source: str, target: str) -> List[str]:
+    """Make `target` a copy of `source` again, returns the paths that differed
+    (including directories that were removed)
+
+    copy2 keeps mtimes, so unchanged files are recognised by size and mtime
+    without reading them.
+    """
+    original_dirs: Set[str] = set()
+    current_dirs: Set[str] = set()
+    original = _files(source, original_dirs)
+    current = _files(target, current_dirs)
+    changed = []
+    for rel, signature in original.items():
+        if current.get(rel) != signature:
+            path = os.path.join(target, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copy2(os.path.join(source, rel), path)
+            changed.append(rel)
+    for rel in current:
+        if rel not in original:
+            os.remove(os.path.join(target, rel))
+            changed.append(rel)
+    # Shortest first, so a created sub-tree goes in one rmtree
+    for rel in sorted(current_dirs - original_dirs, key=len):
+        path = os.path.join(target, rel)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            changed.append(rel)
+    return sorted(changed)
+
+
+def _init_worker(source: str, workdir: str, scripted: bool):
+    """Runs first in every worker process, before the agent modules are
+    imported, so they pick up the worker's own project copy"""
+    root = os.path.join(workdir, f"worker-{os.getpid()}")
+    project = os.path.join(root, "user_project")
+    shutil.rmtree(root, ignore_errors=True)
+    shutil.copytree(source, project, ignore=_ignore)
+    os.environ.update(
+        WORKSPACE_ROOT=project,
+        TRACE_PATH=os.path.join(root, "traces.jsonl"),
+        METRICS_PATH=os.path.join(root, "metrics.prom"),
+        METRICS_PORT="0",
+        # Requests are independent, nothing to resume
+        CHECKPOINT_PATH="",
+    )
+    if scripted:
+        os.environ.setdefault("GOOGLE_API_KEY", "offline-batch")
+
+    import config
+    from runnable import get_runnable
+
+    if scripted:
+        from benchmarks.scripted_model import ScriptedChatModel
+        from llm_client import ManagedClient
+
+        model = ScriptedChatModel(files=sorted(_files(project)))
+        config.set_agent_client(ManagedClient(model, rate_per_second=0))
+
+    _worker.update(source=source, project=project, graph=get_runnable())
+
+
+def run_request(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one request in this worker and reset the project copy afterwards"""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    import tree_index
+    from config import SYSTEM_MESSAGE
+    from conversation import ConversationStore
+    from search_index import get_search_index
+    from symbol_index import get_symbol_index
+    from tools import record_write
+
+    result = {"id": item["id"], "title": item.get("title"), "worker": os.getpid()}
+    conversation = ConversationStore(SYSTEM_MESSAGE)
+    conversation.add(HumanMessage(content=item["prompt"]))
+    started = time.perf_counter()
+    try:
+        response = _worker["graph"].invoke(
+            {"messages": conversation.history()},
+            config={"configurable": {"session_id": f"batch-{item['id']}"}},
+        )
+        answers = [m for m in response["messages"] if isinstance(m, AIMessage)]
+        result.update(ok=True, answer=answers[-1].content if answers else "")
+    except Exception as e:
+        traceback.print_exc()
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.perf_counter() - started
+
+    project = _worker["project"]
+    changed = restore(_worker["source"], project)
+    removed = False
+    for rel in changed:
+        path = os.path.join(project, rel)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", errors="replace") as file:
+                record_write(path, file.read())
+        else:
+            # A removed file or directory, its parent folder is re-scanned
+            tree_index.note_write(path)
+            removed = True
+    if removed:
+        # Paths the request created, the indexes drop them on a full pass
+        get_symbol_index(project).refresh(force=True)
+        get_search_index(project).refresh(force=True)
+    result["changed"] = changed
+    return result
+
+
+def percentile(values: List[float], q: float) -> float:
+    """`q`-th percentile (0-100) with linear interpolation"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def report(results: List[Dict[str, Any]], wall: float):
+    latencies = [r["seconds"] for r in results]
+    failures = [r for r in results if not r["ok"]]
+    print(
+        f"\n{len(results)} requests in {wall:.1f}s "
+        f"({len(results) / wall if wall else 0:.2f} req/s), {len(failures)} failed"
+    )
+    if latencies:
+        print(
+            "latency "
+            + ", ".join(
+                f"p{q} {percentile(latencies, q):.2f}s" for q in (50, 90, 95, 99)
+            )
+            + f", max {max(latencies):.2f}s"
+        )
+    for failure in failures:
+        print(f"  FAILED {failure['id']}: {failure['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("requests", help="JSONL file, one request per line")
+    parser.add_argument("--project", default="user_project")
+    parser.add_argument("--output", default="batch_results.jsonl")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--limit", type=int, default=0, help="0 runs every request")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--scripted", action="store_true")
+    args = parser.parse_args()
+
+    # Workers inherit the environment, .env only has to be read here
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    source = os.path.abspath(args.project)
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+
+    requests = iter_requests(args.requests)
+    results: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    # spawn: workers import the agent after _init_worker set their project
+    with ProcessPoolExecutor(
+        max_workers=args.concurrency,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(source, workdir, args.scripted),
+    ) as pool, open(args.output, "w", encoding="utf-8") as output:
+        pending: Dict[Any, Dict[str, Any]] = {}
+        submitted = 0
+        while True:
+            # Keep a bounded number of requests in flight, the file is
+            # streamed rather than loaded
+            while len(pending) < args.concurrency * 2:
+                if args.limit and submitted >= args.limit:
+                    break
+                item = next(requests, None)
+                if item is None:
+                    break
+                pending[pool.submit(run_request, item)] = item
+                submitted += 1
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. out of memory)
+                    result = {
+                        "id": item["id"],
+                        "title": item.get("title"),
+                        "ok": False,
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": 0.0,
+                    }
+                results.append(result)
+                output.write(json.dumps(result, default=str) + "\n")
+                output.flush()
+                status = "ok" if result["ok"] else "FAILED"
+                print(
+                    f"[{len(results)}/{submitted}] {result['id']} {status} "
+                    f"{result['seconds']:.2f}s"
+                )
+
+    report(results, time.perf_counter() - started)
+    if any(not r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Offline end-to-end benchmark of the agent graph.
+
+Builds synthetic Next.js projects, swaps the chat model for a scripted one
+and runs each workload prompt through runnable.get_runnable(). Reports
+per-stage timings from the tracing spans, message growth and peak memory,
+and compares them against a baseline file:
+
+    python -m benchmarks.agent_bench --sizes 1000,10000 --write-baseline
+    python -m benchmarks.agent_bench --sizes 1000,10000   # exit 1 on regression
+
+Prompts come from requests.jsonl (one JSON object per line, its "body" or
+"prompt" is sent) or from a small built-in list.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic_project import generate_project
+
+DEFAULT_PROMPTS = [
+    "Add a dark mode toggle to the navbar using daisyUI themes.",
+    "Create a /pricing page with three plan cards and a FAQ section.",
+    "Add an API route that returns the current user's profile as JSON.",
+]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Spans reported as stages: tree building, file I/O, model calls
+STAGE_SPANS = ("get_tree", "read_file", "edit_file", "get_codebase_content", "llm_call")
+# Self time of these spans (minus their children) is prompt assembly/orchestration
+ASSEMBLY_SPANS = ("agent_node", "builder_tool")
+# Lower is better for every compared metric
+COMPARED = ("wall_seconds", "peak_rss_mb", "final_message_chars", "llm_input_tokens")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, None where getrusage is missing
+    (Windows)"""
+    if sys.platform == "win32":
+        return None
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB on Linux and the BSDs
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def load_prompts(path: str, limit: int) -> List[str]:
+    prompts: List[str] = []
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                prompt = item.get("prompt") or item.get("body") or item.get("title")
+                if prompt:
+                    prompts.append(prompt)
+    return (prompts or DEFAULT_PROMPTS)[:limit]
+
+
+def summarize_trace(path: str) -> Dict[str, Dict[str, float]]:
+    spans = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            spans = [json.loads(line) for line in file if line.strip()]
+
+    children = defaultdict(float)
+    for item in spans:
+        if item["parent_id"]:
+            children[item["parent_id"]] += item["duration"]
+
+    stages: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {"count": 0, "seconds": 0.0}
+    )
+    tokens = 0
+    for item in spans:
+        name = item["name"]
+        if name in STAGE_SPANS:
+            stages[name]["count"] += 1
+            stages[name]["seconds"] += item["duration"]
+            if name == "get_tree" and stages[name]["count"] == 1:
+                stages["get_tree_first"] = {"count": 1, "seconds": item["duration"]}
+        if name in ASSEMBLY_SPANS:
+            stage = stages["prompt_assembly"]
+            stage["count"] += 1
+            stage["seconds"] += max(item["duration"] - children[item["span_id"]], 0)
+        if name == "llm_call":
+            tokens += item["attributes"].get("input_tokens") or 0
+    return {"stages": dict(stages), "llm_input_tokens": tokens}
+
+
+def run_one(args) -> dict:
+    """Runs inside a fresh interpreter, WORKSPACE_ROOT/TRACE_PATH are set"""
+    import tracemalloc
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    import config
+    from benchmarks.scripted_model import ScriptedChatModel
+    from conversation import ConversationStore
+    from langchain_core.messages import HumanMessage
+    from llm_client import ManagedClient
+    from runnable import get_runnable
+
+    with open(args.files_list, encoding="utf-8") as file:
+        files = json.load(file)
+    model = ScriptedChatModel(files=files, latency=args.latency)
+    config.set_agent_client(ManagedClient(model, rate_per_second=0))
+
+    graph = get_runnable()
+    conversation = ConversationStore("You are a helpful coding assistant.")
+    turns = []
+    started = time.perf_counter()
+    for prompt in load_prompts(args.workload, args.requests):
+        turn_started = time.perf_counter()
+        conversation.add(HumanMessage(content=prompt))
+        response = graph.invoke(
+            {"messages": conversation.history()},
+            config={"configurable": {"session_id": "bench", "thread_id": "bench"}},
+        )
+        conversation.sync(response["messages"])
+        turns.append(
+            {
+                "seconds": time.perf_counter() - turn_started,
+                "messages": len(response["messages"]),
+                "chars": sum(len(str(m.content)) for m in response["messages"]),
+            }
+        )
+    wall = time.perf_counter() - started
+
+    result = {
+        "wall_seconds": wall,
+        "requests": len(turns),
+        "turns": turns,
+        "final_message_chars": turns[-1]["chars"] if turns else 0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.tracemalloc:
+        result["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    result.update(summarize_trace(os.environ["TRACE_PATH"]))
+    return result
+
+
+def run_size(size: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"agent-bench-{size}-") as tmp:
+        project = os.path.join(tmp, "user_project")
+        started = time.perf_counter()
+        files = generate_project(project, size)
+        generate_seconds = time.perf_counter() - started
+
+        files_list = os.path.join(tmp, "files.json")
+        with open(files_list, "w", encoding="utf-8") as file:
+            json.dump(files, file)
+        output = os.path.join(tmp, "result.json")
+
+        env = dict(
+            os.environ,
+            WORKSPACE_ROOT=project,
+            TRACE_PATH=os.path.join(tmp, "traces.jsonl"),
+            CHECKPOINT_PATH=os.path.join(tmp, "checkpoints.sqlite"),
+            METRICS_PATH="",
+            METRICS_PORT="0",
+            LLM_CACHE_MODE="off",
+            GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", "offline-benchmark"),
+        )
+        command = [
+            sys.executable, "-m", "benchmarks.agent_bench", "--run-one",
+            "--files-list", files_list, "--output", output,
+            "--workload", args.workload, "--requests", str(args.requests),
+            "--latency", str(args.latency),
+        ]
+        if args.tracemalloc:
+            command.append("--tracemalloc")
+        subprocess.run(command, env=env, check=True)
+
+        with open(output, encoding="utf-8") as file:
+            result = json.load(file)
+        result["files"] = len(files)
+        result["generate_seconds"] = generate_seconds
+        return result
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float):
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if not base:
+            print(f"{size}: no baseline")
+            continue
+        for metric in COMPARED:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = "REGRESSION" if change > tolerance else ""
+            print(f"{size:>7} {metric:<22} {old:>12.3f} -> {new:>12.3f} {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((size, metric))
+    return regressions
+
+
+def report(size: str, result: dict):
+    rss = result["peak_rss_mb"]
+    print(
+        f"\n{size} files: {result['requests']} requests in "
+        f"{result['wall_seconds']:.3f}s, peak RSS "
+        f"{'n/a' if rss is None else f'{rss:.1f} MB'}, "
+        f"final history {result['final_message_chars']} chars, "
+        f"{result['llm_input_tokens']} model input tokens"
+    )
+    for name, stage in sorted(result["stages"].items()):
+        print(f"  {name:<22} {stage['count']:>5} x  {stage['seconds']:.4f}s")
+    growth = ", ".join(str(turn["chars"]) for turn in result["turns"])
+    print(f"  message chars per turn: {growth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--workload", default="requests.jsonl")
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--run-one", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--files-list", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(run_one(args), file)
+        return
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[str(size)] = run_size(size, args)
+        report(str(size), results[str(size)])
+
+    if args.write_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print()
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Local stand-in for the Gemini REST API, for testing the managed client.
+
+Run it, then point the agent at it:
+
+    python -m benchmarks.fake_model_server --port 8765 --fail-rate 0.2 --delay 0.5
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 GOOGLE_API_KEY=fake streamlit run app.py
+
+Every reply is a short canned text. --fail-rate answers that share of requests
+with 429 and --stall-rate leaves that share hanging for --stall seconds, to
+exercise retries, deadlines and hedged requests.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "This is a canned reply from the fake model server."
+
+
+def candidate(text: str, finish: bool = True):
+    data = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finish:
+        data["finishReason"] = "STOP"
+    return data
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    options = argparse.Namespace(
+        delay=0.0, fail_rate=0.0, stall_rate=0.0, stall=60.0
+    )
+    counter = {"requests": 0, "failed": 0, "stalled": 0}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        options = self.options
+        with self.lock:
+            self.counter["requests"] += 1
+
+        if random.random() < options.fail_rate:
+            with self.lock:
+                self.counter["failed"] += 1
+            self._send_json(
+                429,
+                {"error": {"code": 429, "message": "Resource has been exhausted"}},
+            )
+            return
+        if random.random() < options.stall_rate:
+            with self.lock:
+                self.counter["stalled"] += 1
+            time.sleep(options.stall)
+        time.sleep(options.delay)
+
+        usage = {
+            "promptTokenCount": 10,
+            "candidatesTokenCount": 12,
+            "totalTokenCount": 22,
+        }
+        if ":streamGenerateContent" in self.path:
+            # The REST transport reads a streamed JSON array of responses
+            words = REPLY.split(" ")
+            chunks = [
+                {"candidates": [candidate(word + " ", finish=False)]}
+                for word in words[:-1]
+            ]
+            last = {"candidates": [candidate(words[-1])], "usageMetadata": usage}
+            self._send_json(200, chunks + [last])
+        else:
+            reply = {"candidates": [candidate(REPLY)], "usageMetadata": usage}
+            self._send_json(200, reply)
+
+    def do_GET(self):
+        with self.lock:
+            self._send_json(200, dict(self.counter))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=60.0)
+    args = parser.parse_args()
+
+    FakeGeminiHandler.options = args
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    print(f"Fake model server on http://{args.host}:{args.port} (GET / for counters)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Deterministic chat model that plays the agent's tool-calling script offline."""
+
+import json
+import time
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return "".join(p if isinstance(p, str) else p.get("text", "") for p in content)
+    return content or ""
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replies with preset tool calls, chosen from the bound tools and prompt
+
+    agent role (builder_tool bound): first asks get_codebase_content for a
+    few files, then hands the query to builder_tool. builder role (edit_file
+    bound): reads and edits files for `builder_steps` status updates and
+    calls finish_build with the last edit. Without tools (analyze_code) it
+    returns JSON.
+    """
+
+    files: List[str]
+    model: str = "scripted"
+    latency: float = 0.0  # simulated seconds per call
+    reads_per_step: int = 3
+    builder_steps: int = 2
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _pick(self, seed: str, count: int) -> List[str]:
+        if not self.files:
+            return []
+        start = sum(map(ord, seed)) % len(self.files)
+        return [self.files[(start + i * 7) % len(self.files)] for i in range(count)]
+
+    def _call(self, name: str, args: dict, index: int) -> dict:
+        return {"name": name, "args": args, "id": f"call_{name}_{index}"}
+
+    def _reply(self, messages: List[BaseMessage], tools: set) -> AIMessage:
+        prompt = _text(messages[-1]) if messages else ""
+        query = next(
+            (_text(m) for m in reversed(messages) if isinstance(m, HumanMessage)), ""
+        )
+
+        if "builder_tool" in tools:
+            if "Nothing Yet." in prompt:
+                paths = self._pick(query, self.reads_per_step)
+                calls = [self._call("get_codebase_content", {"filesPaths": paths}, 0)]
+                return AIMessage(content="Reading the relevant files.", tool_calls=calls)
+            calls = [self._call("builder_tool", {"detailedQuery": query[:2000]}, 0)]
+            return AIMessage(content="Delegating to the builder.", tool_calls=calls)
+
+        if "edit_file" in tools:
+            step = sum(
+                "Current status update" in _text(m)
+                for m in messages
+                if isinstance(m, HumanMessage)
+            )
+            if step == 0:
+                calls = [
+                    self._call("read_file", {"filePath": path}, i)
+                    for i, path in enumerate(self._pick(query, self.reads_per_step))
+                ]
+                return AIMessage(content="Plan: read, then edit.", tool_calls=calls)
+            if step <= self.builder_steps:
+                path = self._pick(f"{query}{step}", 1)[0]
+                content = f"// scripted edit {step}\nexport const step = {step};\n"
+                calls = [
+                    self._call(
+                        "edit_file", {"filePath": path, "fileContent": content}, step
+                    )
+                ]
+                if step < self.builder_steps:
+                    return AIMessage(content="Continuing.", tool_calls=calls)
+            else:
+                calls = []
+            # The last edit and the completion signal share one reply
+            summary = {"summary": "All planned steps are complete."}
+            calls.append(self._call("finish_build", summary, step))
+            return AIMessage(content="", tool_calls=calls)
+
+        return AIMessage(
+            content=json.dumps(
+                {
+                    "summary": "Scripted analysis.",
+                    "issues": [],
+                    "recommendations": [],
+                    "architecture": "n/a",
+                }
+            )
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        tools = {tool["function"]["name"] for tool in kwargs.get("tools") or []}
+        message = self._reply(messages, tools)
+        chars = sum(len(_text(m)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": chars // 4,
+            "output_tokens": len(_text(message)) // 4,
+            "total_tokens": (chars + len(_text(message))) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,141 @@
+"""Cold start benchmark and import-time profile of the agent process.
+
+Each repeat starts a fresh interpreter that imports a module (runnable by
+default), compiles the graph and builds the chat client, timing each stage.
+A `python -X importtime` run then shows where import time goes:
+
+    python -m benchmarks.startup_bench --repeat 5 --write-baseline
+    python -m benchmarks.startup_bench --repeat 5   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+STAGES = ("import_seconds", "compile_seconds", "client_seconds", "total_seconds")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import importlib
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+from runnable import get_runnable
+get_runnable()
+compiled = time.perf_counter()
+client = 0.0
+if {client!r}:
+    import config
+    config.get_agent_client()
+    client = time.perf_counter() - compiled
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "compile_seconds": compiled - imported,
+    "client_seconds": client,
+    "total_seconds": time.perf_counter() - started,
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    return dict(
+        os.environ,
+        GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", "offline-benchmark"),
+        CHECKPOINT_PATH="",
+        METRICS_PORT="0",
+    )
+
+
+def cold_start(module: str, client: bool) -> dict:
+    code = CHILD.format(module=module, client=client)
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=_env(), check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(module: str) -> List[Tuple[str, int, int, int]]:
+    """(name, depth, self us, cumulative us) per module from -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_env(), check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cumulative, name = int(parts[0]), int(parts[1]), parts[2][1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, self_us, cumulative))
+    return rows
+
+
+def report_profile(rows: List[Tuple[str, int, int, int]], top: int):
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total = sum(by_package.values())
+    print(f"\nImport profile: {len(rows)} modules, {total / 1e6:.3f}s")
+    print("  by package (self time):")
+    for package, self_us in sorted(by_package.items(), key=lambda i: -i[1])[:top]:
+        print(f"    {package:<36} {self_us / 1e3:>9.1f} ms {self_us / total:>6.1%}")
+    print("  slowest direct imports (cumulative):")
+    direct = [row for row in rows if row[1] == 0]
+    for name, _, _, cumulative in sorted(direct, key=lambda r: -r[3])[:top]:
+        print(f"    {name:<36} {cumulative / 1e3:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="runnable")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-client", action="store_true")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    runs = [cold_start(args.module, not args.no_client) for _ in range(args.repeat)]
+    result = {stage: statistics.median(r[stage] for r in runs) for stage in STAGES}
+    result["modules"] = runs[-1]["modules"]
+    print(f"Cold start of {args.module}, median of {len(runs)}:")
+    for stage in STAGES:
+        print(f"  {stage:<16} {result[stage]:.3f}s")
+    print(f"  {'modules':<16} {result['modules']}")
+
+    report_profile(import_profile(args.module), args.top)
+
+    if args.write_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print()
+        regressed = False
+        for stage in STAGES:
+            old, new = baseline.get(stage), result[stage]
+            if not old:
+                continue
+            change = (new - old) / old
+            flag = "REGRESSION" if change > args.tolerance else ""
+            print(f"  {stage:<16} {old:.3f}s -> {new:.3f}s {change:+7.1%} {flag}")
+            regressed = regressed or bool(flag)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Generate synthetic Next.js 15 (App Router) projects of a given size."""
+
+import json
+import os
+import random
+from typing import List
+
+PAGE = """import {{ {component} }} from "@/components/{group}/{component}";
+import {{ {helper} }} from "@/lib/{lib}";
+
+export const metadata = {{ title: "{route}" }};
+
+export default async function Page() {{
+  const data = await {helper}("{route}");
+  return (
+    <main className="container mx-auto p-4">
+      <h1 className="text-2xl font-bold">{route}</h1>
+      <{component} items={{data}} />
+    </main>
+  );
+}}
+"""
+
+COMPONENT = """"use client";
+
+import {{ useState }} from "react";
+import {{ {helper} }} from "@/lib/{lib}";
+
+export interface {component}Props {{
+  items?: string[];
+}}
+
+export function {component}({{ items = [] }}: {component}Props) {{
+  const [open, setOpen] = useState(false);
+  return (
+    <div className="card bg-base-100 shadow-xl">
+      <button className="btn btn-primary" onClick={{() => setOpen(!open)}}>
+        {component}
+      </button>
+      {{open && items.map((item) => <p key={{item}}>{{{helper}(item)}}</p>)}}
+    </div>
+  );
+}}
+
+export default {component};
+"""
+
+LIB = """export function {helper}(value: string) {{
+  return value.trim().toLowerCase();
+}}
+
+export async function fetch{name}(route: string) {{
+  return [route, "{name}"];
+}}
+"""
+
+ROUTE = """import {{ NextResponse }} from "next/server";
+
+export async function GET() {{
+  return NextResponse.json({{ route: "{route}" }});
+}}
+
+export async function POST(request: Request) {{
+  const body = await request.json();
+  return NextResponse.json({{ received: body }});
+}}
+"""
+
+HOOK = """import {{ useEffect, useState }} from "react";
+
+export function use{name}() {{
+  const [value, setValue] = useState<string | null>(null);
+  useEffect(() => setValue("{name}"), []);
+  return value;
+}}
+"""
+
+
+def _write(root: str, relative: str, content: str):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+def generate_project(root: str, files: int, seed: int = 0) -> List[str]:
+    """Write a project with roughly `files` source files, returns their paths"""
+    rng = random.Random(seed)
+    written: List[str] = []
+
+    def write(relative: str, content: str):
+        _write(root, relative, content)
+        written.append(relative)
+
+    write(
+        "package.json",
+        json.dumps(
+            {
+                "name": "user_project",
+                "private": True,
+                "scripts": {"dev": "next dev", "build": "next build"},
+                "dependencies": {"next": "15.0.0", "react": "19.0.0", "daisyui": "4"},
+            },
+            indent=2,
+        ),
+    )
+    write(
+        "tsconfig.json",
+        json.dumps(
+            {"compilerOptions": {"baseUrl": ".", "paths": {"@/*": ["./src/*"]}}},
+            indent=2,
+        ),
+    )
+    write(".gitignore", "node_modules\n.next\ndist\ncoverage\n")
+    write(
+        "src/app/layout.tsx",
+        "export default function RootLayout({ children }) {\n"
+        "  return <html><body>{children}</body></html>;\n}\n",
+    )
+
+    # Split the remaining budget between pages, components, libs, hooks, routes
+    remaining = max(files - len(written), 5)
+    libs = max(remaining // 10, 1)
+    hooks = max(remaining // 20, 1)
+    routes = max(remaining // 20, 1)
+    pages = max(remaining // 5, 1)
+    components = max(remaining - libs - hooks - routes - pages, 1)
+
+    lib_names = [f"lib{i}" for i in range(libs)]
+    for index, lib in enumerate(lib_names):
+        name = f"Data{index}"
+        write(f"src/lib/{lib}.ts", LIB.format(helper=f"format{index}", name=name))
+
+    component_refs = []
+    for index in range(components):
+        group = f"group{index // 50}"
+        component = f"Widget{index}"
+        lib_index = rng.randrange(libs)
+        write(
+            f"src/components/{group}/{component}.tsx",
+            COMPONENT.format(
+                component=component,
+                helper=f"format{lib_index}",
+                lib=lib_names[lib_index],
+            ),
+        )
+        component_refs.append((group, component))
+
+    for index in range(hooks):
+        write(f"src/hooks/use{index}.ts", HOOK.format(name=f"Thing{index}"))
+
+    for index in range(routes):
+        route = f"resource{index}"
+        write(f"src/app/api/{route}/route.ts", ROUTE.format(route=route))
+
+    for index in range(pages):
+        route = f"section{index // 100}/page{index}"
+        group, component = component_refs[rng.randrange(len(component_refs))]
+        lib_index = rng.randrange(libs)
+        write(
+            f"src/app/{route}/page.tsx",
+            PAGE.format(
+                component=component,
+                group=group,
+                helper=f"fetchData{lib_index}",
+                lib=lib_names[lib_index],
+                route=route,
+            ),
+        )
+
+    # Build output the walker is expected to skip
+    for index in range(min(files // 10, 1000)):
+        _write(root, f".next/cache/chunk{index}.js", "x")
+        _write(root, f"node_modules/pkg{index // 100}/index{index}.js", "x")
+
+    return written
@@ -0,0 +1,100 @@
+"""Compare the legacy listdir walker with walker.walk on a synthetic tree.
+
+Run from the repository root:
+
+    python -m benchmarks.walker_bench --files 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from walker import IGNORED, walk
+
+
+def make_tree(root: str, files: int, per_dir: int = 50, artifact_ratio: float = 0.4):
+    """Create `files` files, `artifact_ratio` of them under gitignored build folders"""
+    artifact_files = int(files * artifact_ratio)
+    source_files = files - artifact_files
+
+    def fill(base: str, count: int, ext: str):
+        for i in range(count):
+            directory = os.path.join(
+                base, f"d{i // (per_dir * per_dir)}", f"m{i // per_dir}"
+            )
+            if i % per_dir == 0:
+                os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"f{i}{ext}"), "w") as file:
+                file.write("x")
+
+    fill(os.path.join(root, "src", "components"), source_files, ".tsx")
+    for index, name in enumerate(("dist", "coverage", ".turbo")):
+        share = artifact_files // 3 + (artifact_files % 3 if index == 0 else 0)
+        fill(os.path.join(root, name), share, ".js")
+
+    with open(os.path.join(root, ".gitignore"), "w") as file:
+        file.write("dist/\ncoverage/\n.turbo\n*.log\n")
+
+
+def legacy_walk(directory: str) -> int:
+    """The original get_tree traversal: listdir + isdir per entry"""
+    count = 0
+    for item in sorted(os.listdir(directory)):
+        if item in IGNORED:
+            continue
+        count += 1
+        path = os.path.join(directory, item)
+        if os.path.isdir(path):
+            count += legacy_walk(path)
+    return count
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="walker_bench_")
+    try:
+        print(f"Building synthetic tree with {args.files} files in {root} ...")
+        make_tree(root, args.files)
+
+        def entries(scans):
+            return sum(len(scan.entries) for scan in scans.values())
+
+        rows = [
+            ("legacy listdir+isdir", lambda: legacy_walk(root)),
+            ("scandir, 1 worker", lambda: entries(walk(root, workers=1))),
+            (
+                f"scandir, {args.workers} workers",
+                lambda: entries(walk(root, workers=args.workers)),
+            ),
+        ]
+        baseline = None
+        for label, fn in rows:
+            seconds, count = timed(fn, args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"{label:<28} {seconds * 1000:9.1f} ms  {count:>8} entries"
+                f"  x{baseline / seconds:.1f}"
+            )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+from llm_cache import dump_response, load_response
+
+# Graph checkpoints of every session, "" keeps runs in memory only
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+# Checkpoints kept per thread, older ones are only needed for time travel
+CHECKPOINTS_KEPT = int(os.getenv("CHECKPOINTS_KEPT", "20"))
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        session_id TEXT,
+        type TEXT,
+        checkpoint BLOB,
+        metadata_type TEXT,
+        metadata BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )""",
+    # Model responses of the node in flight, replayed if it is run again
+    """CREATE TABLE IF NOT EXISTS steps (
+        thread_id TEXT NOT NULL,
+        key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        response TEXT NOT NULL,
+        PRIMARY KEY (thread_id, key, seq)
+    )""",
+    # Runs that ended with an error, they are not resumed automatically
+    """CREATE TABLE IF NOT EXISTS failures (
+        thread_id TEXT PRIMARY KEY,
+        error TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS checkpoints_session ON checkpoints(session_id)",
+)
+
+
+def _ids(config: RunnableConfig) -> Tuple[str, str, Optional[str]]:
+    configurable = config["configurable"]
+    return (
+        configurable["thread_id"],
+        configurable.get("checkpoint_ns", ""),
+        configurable.get("checkpoint_id"),
+    )
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """LangGraph checkpoint saver on a local SQLite file.
+
+    The graph saves a checkpoint after every node, a run that was cut short
+    resumes from the last one. Model calls made inside a node are kept as
+    steps until the node finishes so re-running it does not repeat them.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH, kept: int = CHECKPOINTS_KEPT):
+        super().__init__()
+        self.path = path
+        self.kept = kept
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _tuple(self, row: Sequence[Any]) -> CheckpointTuple:
+        thread_id, ns, checkpoint_id, parent_id, type_, data, meta_type, meta = row
+        with self._lock:
+            writes = self._connect().execute(
+                """SELECT task_id, channel, type, value FROM writes
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+                ORDER BY task_id, idx""",
+                (thread_id, ns, checkpoint_id),
+            ).fetchall()
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+        parent = None
+        if parent_id:
+            parent = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns,
+                    "checkpoint_id": parent_id,
+                }
+            }
+        return CheckpointTuple(
+            config=config,
+            checkpoint=self.serde.loads_typed((type_, data)),
+            metadata=self.serde.loads_typed((meta_type, meta)),
+            parent_config=parent,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns, checkpoint_id = _ids(config)
+        query = """SELECT thread_id, checkpoint_ns, checkpoint_id,
+            parent_checkpoint_id, type, checkpoint, metadata_type, metadata
+            FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"""
+        params: Tuple[Any, ...] = (thread_id, ns)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            # Checkpoint ids are time-ordered
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._connect().execute(query, params).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = """SELECT thread_id, checkpoint_ns, checkpoint_id,
+            parent_checkpoint_id, type, checkpoint, metadata_type, metadata
+            FROM checkpoints"""
+        clauses, params = [], []
+        if config:
+            thread_id, ns, checkpoint_id = _ids(config)
+            clauses.append("thread_id = ?")
+            params.append(thread_id)
+            if "checkpoint_ns" in config["configurable"]:
+                clauses.append("checkpoint_ns = ?")
+                params.append(ns)
+            if checkpoint_id:
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before:
+            clauses.append("checkpoint_id < ?")
+            params.append(before["configurable"]["checkpoint_id"])
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+
+        found = 0
+        for row in rows:
+            item = self._tuple(row)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+            found += 1
+            if limit is not None and found >= limit:
+                return
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, ns, parent_id = _ids(config)
+        session_id = config["configurable"].get("session_id") or metadata.get(
+            "session_id"
+        )
+        type_, data = self.serde.dumps_typed(checkpoint)
+        meta_type, meta = self.serde.dumps_typed(dict(metadata))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, ns, checkpoint["id"], parent_id, session_id,
+                    type_, data, meta_type, meta,
+                ),
+            )
+            self._prune(conn, thread_id, ns)
+            conn.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ):
+        thread_id, ns, checkpoint_id = _ids(config)
+        rows = []
+        for index, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id, ns, checkpoint_id, task_id,
+                    WRITES_IDX_MAP.get(channel, index), channel, type_, data,
+                )
+            )
+        # Special channels (errors, interrupts) replace an earlier write
+        special = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        verb = "INSERT OR REPLACE" if special else "INSERT OR IGNORE"
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.commit()
+
+    def _prune(self, conn: sqlite3.Connection, thread_id: str, ns: str):
+        if not self.kept:
+            return
+        stale = conn.execute(
+            """SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?""",
+            (thread_id, ns, self.kept),
+        ).fetchall()
+        for table in ("checkpoints", "writes"):
+            conn.executemany(
+                f"""DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ?
+                AND checkpoint_id = ?""",
+                [(thread_id, ns, checkpoint_id) for (checkpoint_id,) in stale],
+            )
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            conn = self._connect()
+            for table in ("checkpoints", "writes", "steps", "failures"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+
+    def latest_thread(self, session_id: str) -> Optional[str]:
+        """Thread the session checkpointed last, None for a new session"""
+        with self._lock:
+            row = self._connect().execute(
+                """SELECT thread_id FROM checkpoints WHERE session_id = ?
+                ORDER BY checkpoint_id DESC LIMIT 1""",
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_failure(self, thread_id: str, error: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO failures VALUES (?, ?)", (thread_id, error)
+            )
+            conn.commit()
+
+    def clear_failure(self, thread_id: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM failures WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+
+    def failure(self, thread_id: str) -> Optional[str]:
+        """Error of the thread's last run, None if it succeeded or was cut short"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT error FROM failures WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_step(self, thread_id: str, key: str, seq: int) -> Optional[BaseMessage]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM steps WHERE thread_id = ? AND key = ? AND seq = ?",
+                (thread_id, key, seq),
+            ).fetchone()
+        return load_response(row[0]) if row else None
+
+    def put_step(self, thread_id: str, key: str, seq: int, response: BaseMessage):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?)",
+                (thread_id, key, seq, dump_response(response)),
+            )
+            conn.commit()
+
+    def clear_steps(self, thread_id: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM steps WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+
+
+class StepLog:
+    """Model responses of one node run, the n-th call with the same `key`
+    in a re-run gets the n-th response of the interrupted run"""
+
+    def __init__(self, checkpointer: SqliteCheckpointer, thread_id: str):
+        self.checkpointer = checkpointer
+        self.thread_id = thread_id
+        self._seen: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _next(self, key: str) -> int:
+        with self._lock:
+            self._seen[key] += 1
+            return self._seen[key]
+
+    def replay(self, key: str) -> Tuple[int, Optional[BaseMessage]]:
+        seq = self._next(key)
+        return seq, self.checkpointer.get_step(self.thread_id, key, seq)
+
+    def record(self, key: str, seq: int, response: BaseMessage):
+        self.checkpointer.put_step(self.thread_id, key, seq, response)
+
+
+_steps: ContextVar[Optional[StepLog]] = ContextVar("step_log", default=None)
+
+
+def current_steps() -> Optional[StepLog]:
+    return _steps.get()
+
+
+# Where LangGraph puts the graph's saver in the config of each node run
+CONFIG_KEY_CHECKPOINTER = "__pregel_checkpointer"
+
+
+@contextmanager
+def node_steps(config: Optional[RunnableConfig]):
+    """Log model calls of the node running under `config` until it finishes
+
+    Uses the saver the graph was compiled with, steps are only logged when
+    it is a SqliteCheckpointer.
+    """
+    configurable = (config or {}).get("configurable") or {}
+    thread_id = configurable.get("thread_id")
+    if CONFIG_KEY_CHECKPOINTER in configurable:
+        checkpointer = configurable[CONFIG_KEY_CHECKPOINTER]
+    else:
+        checkpointer = get_checkpointer()
+    if not isinstance(checkpointer, SqliteCheckpointer) or thread_id is None:
+        yield None
+        return
+    log = StepLog(checkpointer, thread_id)
+    token = _steps.set(log)
+    try:
+        yield log
+    finally:
+        _steps.reset(token)
+    # Only reached when the node succeeded, its result is in the next checkpoint
+    checkpointer.clear_steps(thread_id)
+
+
+_checkpointer: Optional[SqliteCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> Optional[SqliteCheckpointer]:
+    """The process-wide checkpointer, None when CHECKPOINT_PATH is empty"""
+    global _checkpointer
+    if not CHECKPOINT_PATH:
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SqliteCheckpointer()
+        return _checkpointer
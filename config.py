@@ -1,12 +1,69 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
+import os
+import threading
+from typing import Optional
+from llm_client import LLM_TIMEOUT, ManagedClient
 
-load_dotenv()
+# Settings come from the environment, entry points (app.py, batch.py) load
+# .env before importing the agent modules
 
-client = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
+# Root folder of the project the agent works on ("user_project" in prompts)
+WORKSPACE_ROOT = os.path.normpath(
+    os.getenv("WORKSPACE_ROOT", os.path.join(os.getcwd(), "user_project"))
 )
 
+# Prompt budget for the project tree, 0 renders the full tree
+TREE_TOKEN_BUDGET = int(os.getenv("TREE_TOKEN_BUDGET", "1500"))
+TREE_MAX_DEPTH = int(os.getenv("TREE_MAX_DEPTH", "4"))
 
-def get_agent_client():
-    return client
+# Snippets from the local search index added to the first agent prompt, 0 = off
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "5"))
+
+SYSTEM_MESSAGE = """
+    You are a coding assistant who must **always** use available tools to edit and modify code. 
+    Always use builder_tool for coding related tasks.
+    Your tech stack is only: Next.js 15 with app router, backend in API routes, DaisyUI for UI framework.
+    
+    Before making changes, analyze the current code structure to maintain consistency.
+    Provide step-by-step explanations of what you're doing and why.
+    """
+
+
+def create_chat_model():
+    # Imported here, the Gemini client and its protobuf types are slow to load
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs = {}
+    if LLM_TIMEOUT:
+        # Ends the request itself, ManagedClient only stops waiting for it
+        kwargs["timeout"] = LLM_TIMEOUT
+    # Point the client at another server, e.g. a local fake for load tests
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        kwargs.update(client_options={"api_endpoint": endpoint}, transport="rest")
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        max_retries=1,  # retries are handled by ManagedClient
+        **kwargs,
+    )
+
+
+_client: Optional[ManagedClient] = None
+_client_lock = threading.Lock()
+
+
+def get_agent_client() -> ManagedClient:
+    """The shared client, the chat model is built on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ManagedClient(create_chat_model())
+    return _client
+
+
+def set_agent_client(model):
+    """Swap the chat model used by every agent call (e.g. a scripted fake)"""
+    global _client
+    with _client_lock:
+        _client = model if isinstance(model, ManagedClient) else ManagedClient(model)
+    return _client
@@ -0,0 +1,161 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from deltas import content_hash
+
+# Upper bound of file content kept in GraphState.context across turns
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "60000"))
+# Share of it rendered into one agent prompt
+CONTEXT_PROMPT_TOKENS = int(os.getenv("CONTEXT_PROMPT_TOKENS", "8000"))
+CHARS_PER_TOKEN = 4
+
+# Oversized files are shown as a head/tail excerpt of at most half the
+# prompt share, and only if at least this many tokens are left for it
+EXCERPT_MIN_TOKENS = 200
+
+# A file scores one point per matching query term and loses RECENCY_DECAY
+# per turn since it was last added or used
+RECENCY_DECAY = 0.5
+
+
+def _tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _terms(text: Optional[str]) -> Set[str]:
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return {word for word in words if len(word) > 2}
+
+
+def excerpt(content: str, max_tokens: int) -> str:
+    """Head and tail of `content` within `max_tokens`, cut at line breaks"""
+    budget = max_tokens * CHARS_PER_TOKEN
+    head = content[: budget * 2 // 3]
+    head = head[: head.rfind("\n") + 1] or head
+    tail = content[len(content) - budget // 3 :]
+    tail = tail[tail.find("\n") + 1 :] if "\n" in tail else tail
+    omitted = content.count("\n") - head.count("\n") - tail.count("\n")
+    return f"{head}[... {omitted} lines omitted ...]\n{tail}"
+
+
+class ContextStore:
+    """File contents carried between agent turns, stored once per content hash
+    and bounded by a token budget.
+
+    Works on the plain dict kept in GraphState.context so the state stays
+    serializable:
+
+        {"turn": 3,
+         "query": "user request of the current turn",
+         "files": {path: {"hash": h, "tokens": n, "turn": t, "uses": u}},
+         "blobs": {h: content}}
+    """
+
+    def __init__(
+        self,
+        state: Optional[Dict[str, Any]] = None,
+        max_tokens: int = CONTEXT_MAX_TOKENS,
+    ):
+        state = state or {}
+        self.max_tokens = max_tokens
+        self.turn: int = state.get("turn", 0)
+        # Ranks files for eviction as well as for rendering
+        self.query: Optional[str] = state.get("query")
+        self.files: Dict[str, Dict[str, int]] = {
+            path: dict(meta) for path, meta in (state.get("files") or {}).items()
+        }
+        self.blobs: Dict[str, str] = dict(state.get("blobs") or {})
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "turn": self.turn,
+            "query": self.query,
+            "files": self.files,
+            "blobs": self.blobs,
+        }
+
+    def next_turn(self, query: Optional[str] = None):
+        self.turn += 1
+        if query is not None:
+            self.query = query
+
+    def add(self, path: str, content: str):
+        digest = content_hash(content)
+        self.blobs.setdefault(digest, content)
+        meta = self.files.get(path, {"uses": 0})
+        meta.update(hash=digest, tokens=_tokens(content), turn=self.turn)
+        meta["uses"] += 1
+        self.files[path] = meta
+        self._collect()
+
+    def update(self, files_content: Dict[str, str]):
+        for path, content in files_content.items():
+            self.add(path, content)
+
+    def get(self, path: str) -> Optional[str]:
+        meta = self.files.get(path)
+        return self.blobs.get(meta["hash"]) if meta else None
+
+    def total_tokens(self) -> int:
+        return sum(self._blob_tokens().values())
+
+    def _blob_tokens(self) -> Dict[str, int]:
+        return {meta["hash"]: meta["tokens"] for meta in self.files.values()}
+
+    def score(self, path: str, terms: Set[str]) -> float:
+        meta = self.files[path]
+        relevance = sum(term in path.lower() for term in terms)
+        age = self.turn - meta["turn"]
+        return relevance + meta["uses"] * 0.25 - age * RECENCY_DECAY
+
+    def _ranked(self, query: Optional[str]) -> List[str]:
+        terms = _terms(query)
+        return sorted(
+            self.files, key=lambda path: self.score(path, terms), reverse=True
+        )
+
+    def _collect(self):
+        """Drop unreferenced blobs, then the files scoring lowest for the
+        current query while over budget"""
+        while self.files and self.total_tokens() > self.max_tokens:
+            del self.files[self._ranked(self.query)[-1]]
+        referenced = {meta["hash"] for meta in self.files.values()}
+        for digest in [d for d in self.blobs if d not in referenced]:
+            del self.blobs[digest]
+
+    def render(
+        self,
+        query: Optional[str] = None,
+        max_tokens: int = CONTEXT_PROMPT_TOKENS,
+    ) -> str:
+        """Highest scoring files that fit `max_tokens`, files too large for
+        what is left as an excerpt, the rest by name only"""
+        parts, skipped = [], []
+        used = 0
+        rendered: Set[str] = set()
+        for path in self._ranked(query):
+            meta = self.files[path]
+            if meta["hash"] in rendered:
+                parts.append(f"--- {path} (same content as a file above)")
+                continue
+            content = self.blobs[meta["hash"]]
+            left = max_tokens - used
+            if meta["tokens"] > left:
+                # Fetching the file again would not make it fit either
+                if left < EXCERPT_MIN_TOKENS:
+                    skipped.append(path)
+                    continue
+                content = excerpt(content, min(left, max_tokens // 2))
+                used += _tokens(content)
+                parts.append(f"--- {path} [{meta['hash']}] (excerpt)\n{content}")
+                continue
+            used += meta["tokens"]
+            rendered.add(meta["hash"])
+            parts.append(f"--- {path} [{meta['hash']}]\n{content}")
+        if skipped:
+            parts.append(
+                "Also read earlier (not shown for space, their content has not "
+                f"changed since): {', '.join(skipped)}"
+            )
+        return "\n".join(parts) if parts else "No file contents kept."
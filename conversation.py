@@ -0,0 +1,122 @@
+import os
+import uuid
+from typing import Iterable, List, Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+
+# Past this many messages the oldest turns are folded into a summary
+MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "40"))
+# Messages kept verbatim after a compaction
+KEEP_RECENT = int(os.getenv("CONVERSATION_KEEP_RECENT", "16"))
+SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", "4000"))
+SUMMARY_LINE_CHARS = 200
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def message_id(message: BaseMessage) -> str:
+    """Return the message id, assigning one if the message has none"""
+    if not message.id:
+        message.id = str(uuid.uuid4())
+    return message.id
+
+
+class ConversationStore:
+    """Session history that grows by deltas and compacts old turns"""
+
+    def __init__(
+        self,
+        system_message: str,
+        max_messages: int = MAX_MESSAGES,
+        keep_recent: int = KEEP_RECENT,
+    ):
+        self.max_messages = max_messages
+        self.keep_recent = keep_recent
+        self.system = SystemMessage(content=system_message)
+        self.summary = ""
+        self.summary_message: Optional[SystemMessage] = None
+        self.messages: List[BaseMessage] = []
+        self._ids = {message_id(self.system)}
+
+    @classmethod
+    def restore(
+        cls, system_message: str, messages: Iterable[BaseMessage], **kwargs
+    ) -> "ConversationStore":
+        """Rebuild a store from a history it produced (e.g. a checkpoint)"""
+        store = cls(system_message, **kwargs)
+        for message in messages:
+            if isinstance(message, SystemMessage):
+                if message.content.startswith(SUMMARY_PREFIX):
+                    store.summary = message.content[len(SUMMARY_PREFIX) :]
+                    store.summary_message = message
+                    store._ids.add(message_id(message))
+                continue
+            store.add(message)
+        return store
+
+    def history(self) -> List[BaseMessage]:
+        """Messages to send to the agent: system prompt, summary, recent turns"""
+        head = [self.system]
+        if self.summary_message:
+            head.append(self.summary_message)
+        return head + self.messages
+
+    def add(self, message: BaseMessage) -> bool:
+        key = message_id(message)
+        if key in self._ids:
+            return False
+        self._ids.add(key)
+        self.messages.append(message)
+        return True
+
+    def sync(self, messages: Iterable[BaseMessage]) -> List[BaseMessage]:
+        """Append the messages not seen yet (e.g. a graph result) and compact"""
+        added = [message for message in messages if self.add(message)]
+        self.compact()
+        return added
+
+    def compact(self):
+        if len(self.messages) <= self.max_messages:
+            return
+
+        # Cut on a user turn so tool calls are never separated from results
+        cut = len(self.messages) - self.keep_recent
+        while cut > 0 and not isinstance(self.messages[cut], HumanMessage):
+            cut -= 1
+        if cut <= 0:
+            return
+
+        old, self.messages = self.messages[:cut], self.messages[cut:]
+        lines = [self.summary] if self.summary else []
+        for message in old:
+            self._ids.discard(message.id)
+            if isinstance(message, HumanMessage):
+                role = "User"
+            elif isinstance(message, AIMessage):
+                role = "Assistant"
+            else:
+                continue
+            text = message.content
+            if not isinstance(text, str):
+                text = str(text)
+            text = " ".join(text.split())
+            if len(text) > SUMMARY_LINE_CHARS:
+                text = text[:SUMMARY_LINE_CHARS] + "..."
+            lines.append(f"- {role}: {text}")
+
+        summary = "\n".join(lines)
+        if len(summary) > SUMMARY_MAX_CHARS:
+            # Keep the most recent part of the summary
+            summary = summary[-SUMMARY_MAX_CHARS:]
+            summary = summary[summary.find("\n") + 1 :]
+        self.summary = summary
+
+        if self.summary_message:
+            self._ids.discard(self.summary_message.id)
+        self.summary_message = SystemMessage(content=SUMMARY_PREFIX + summary)
+        self._ids.add(message_id(self.summary_message))
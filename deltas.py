@@ -0,0 +1,51 @@
+import difflib
+import hashlib
+from typing import Dict, Optional, Tuple
+
+
+def content_hash(content: str) -> str:
+    """Short, stable hash used to refer to a file version in prompts"""
+    return hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest()[:12]
+
+
+class DeltaTracker:
+    """Remembers what the model has already been shown, to send only changes"""
+
+    def __init__(self):
+        self._files: Dict[str, Tuple[str, str]] = {}  # path -> (hash, content)
+        self._tree: Optional[str] = None
+
+    def tree(self, tree: str) -> str:
+        if tree == self._tree:
+            return "(unchanged since the last update)"
+        self._tree = tree
+        return tree
+
+    def files(self, files_content: Dict[str, str]) -> str:
+        """Describe `files_content` relative to what was sent before"""
+        parts = []
+        for path, content in files_content.items():
+            digest = content_hash(content)
+            seen = self._files.get(path)
+            self._files[path] = (digest, content)
+
+            if seen is None:
+                parts.append(f"### {path} [{digest}] (full content)\n{content}")
+                continue
+            if seen[0] == digest:
+                parts.append(f"### {path} [{digest}] (unchanged, shown earlier)")
+                continue
+
+            diff = "".join(
+                difflib.unified_diff(
+                    seen[1].splitlines(keepends=True),
+                    content.splitlines(keepends=True),
+                    fromfile=f"{path} [{seen[0]}]",
+                    tofile=f"{path} [{digest}]",
+                )
+            )
+            if len(diff) < len(content):
+                parts.append(f"### {path} [{digest}] (diff since [{seen[0]}])\n{diff}")
+            else:
+                parts.append(f"### {path} [{digest}] (full content)\n{content}")
+        return "\n\n".join(parts)
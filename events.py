@@ -0,0 +1,13 @@
+from typing import Any
+
+from langgraph.config import get_stream_writer
+
+
+def emit(event: str, **data: Any):
+    """Send a progress event to the graph's "custom" stream, if a run is streaming"""
+    try:
+        writer = get_stream_writer()
+    except Exception:
+        # Called outside of a graph run (scripts, tests)
+        return
+    writer({"event": event, **data})
@@ -0,0 +1,325 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from conversation import ConversationStore
+
+# Agent runs executing at once across all sessions
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+# Runs a single session may have waiting behind its current one
+SESSION_QUEUE_SIZE = int(os.getenv("SESSION_QUEUE_SIZE", "4"))
+# Finished jobs kept per session for UIs that reconnect
+KEPT_JOBS = 20
+# Idle sessions kept in memory, the others reload from their checkpoints
+SESSIONS_IN_MEMORY = int(os.getenv("SESSIONS_IN_MEMORY", "64"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class SessionBusy(Exception):
+    """The session already has SESSION_QUEUE_SIZE runs waiting"""
+
+
+class Job:
+    """One agent run: its progress events, final state and status.
+
+    Events are kept for the job's lifetime so a UI that reconnects (e.g.
+    after a Streamlit rerun) can replay them from any position.
+    """
+
+    def __init__(self, session_id: str, message: Optional[BaseMessage]):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.message = message
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._events: List[Dict[str, Any]] = []
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def _publish(self, event: Dict[str, Any]):
+        with self._changed:
+            self._events.append(event)
+            self._changed.notify_all()
+
+    def _finish(self, status: str, result=None, error: Optional[str] = None):
+        with self._changed:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            self._changed.notify_all()
+
+    def poll(self, since: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Events after position `since` and the next position to poll from"""
+        with self._changed:
+            events = self._events[since:]
+            return events, since + len(events)
+
+    def subscribe(
+        self, since: int = 0, timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield events as they arrive until the job finishes"""
+        position = since
+        while True:
+            with self._changed:
+                if position >= len(self._events) and not self.done:
+                    self._changed.wait(timeout)
+                events = self._events[position:]
+                finished = self.done
+            position += len(events)
+            yield from events
+            if finished and position >= len(self._events):
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: self.done, timeout)
+
+
+class Session:
+    """State owned by one user session, never shared with other sessions
+
+    Its conversation lives in the graph checkpoints of `thread_id`, it is
+    loaded on first use rather than kept for every session.
+    """
+
+    def __init__(self, session_id: str, system_message: str, thread_id: str):
+        self.id = session_id
+        self.system_message = system_message
+        self.thread_id = thread_id
+        self.conversation: Optional[ConversationStore] = None
+        self.queue: Deque[Job] = deque()
+        self.current: Optional[Job] = None
+        self.jobs: Dict[str, Job] = {}
+        self.used = time.monotonic()
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {"configurable": {"session_id": self.id, "thread_id": self.thread_id}}
+
+    @property
+    def idle(self) -> bool:
+        return self.current is None and not self.queue
+
+
+class ExecutionService:
+    """Runs agent jobs on a bounded worker pool.
+
+    Jobs of one session run in order, one at a time, against that session's
+    conversation; different sessions run concurrently up to `workers`.
+    """
+
+    def __init__(
+        self,
+        graph_factory: Callable[[], Any],
+        workers: int = AGENT_WORKERS,
+        queue_size: int = SESSION_QUEUE_SIZE,
+    ):
+        self._graph_factory = graph_factory
+        self._graph = None
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="agent"
+        )
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def graph(self):
+        with self._lock:
+            if self._graph is None:
+                self._graph = self._graph_factory()
+            return self._graph
+
+    def checkpointer(self):
+        return getattr(self.graph(), "checkpointer", None)
+
+    def session(self, session_id: str, system_message: str = "") -> Session:
+        checkpointer = self.checkpointer()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.used = time.monotonic()
+                return session
+        # A session seen before a restart continues on its last thread
+        thread_id = checkpointer and checkpointer.latest_thread(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(
+                    session_id, system_message, thread_id or session_id
+                )
+            return session
+
+    def reset(self, session_id: str, system_message: str):
+        """Start the session over on a new thread, runs in flight finish but
+        are not kept"""
+        checkpointer = self.checkpointer()
+        with self._lock:
+            old = self._sessions.get(session_id)
+            thread_id = f"{session_id}-{uuid.uuid4().hex[:8]}"
+            self._sessions[session_id] = Session(session_id, system_message, thread_id)
+        if checkpointer and old and old.idle:
+            checkpointer.delete_thread(old.thread_id)
+
+    def conversation(self, session: Session) -> ConversationStore:
+        """The session's conversation, restored from its latest checkpoint"""
+        if session.conversation is None:
+            messages = []
+            if self.checkpointer():
+                snapshot = self.graph().get_state(session.config)
+                messages = (snapshot.values or {}).get("messages") or []
+            session.conversation = ConversationStore.restore(
+                session.system_message, messages
+            )
+        return session.conversation
+
+    def history(self, session_id: str, system_message: str = "") -> List[BaseMessage]:
+        session = self.session(session_id, system_message)
+        return list(self.conversation(session).messages)
+
+    def resume(self, session_id: str, system_message: str = "") -> Optional[Job]:
+        """Finish a run that was interrupted (e.g. by a restart) from its
+        last checkpoint, None if there is nothing to resume. Runs that
+        failed with an error are not retried, they would fail again."""
+        checkpointer = self.checkpointer()
+        if not checkpointer:
+            return None
+        session = self.session(session_id, system_message)
+        with self._lock:
+            if not session.idle:
+                return None
+        if checkpointer.failure(session.thread_id) is not None:
+            return None
+        if not self.graph().get_state(session.config).next:
+            return None
+        return self._enqueue(session, Job(session_id, None))
+
+    def submit(self, session_id: str, prompt: str, system_message: str = "") -> Job:
+        session = self.session(session_id, system_message)
+        return self._enqueue(session, Job(session_id, HumanMessage(content=prompt)))
+
+    def _enqueue(self, session: Session, job: Job) -> Job:
+        with self._lock:
+            if len(session.queue) >= self.queue_size:
+                raise SessionBusy(
+                    f"Session {session.id} has {len(session.queue)} runs queued"
+                )
+            session.jobs[job.id] = job
+            session.queue.append(job)
+            start = session.current is None
+            if start:
+                session.current = session.queue.popleft()
+        if start:
+            self._pool.submit(self._drain, session)
+        return job
+
+    def job(self, session_id: str, job_id: str) -> Optional[Job]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.jobs.get(job_id) if session else None
+
+    def active_job(self, session_id: str) -> Optional[Job]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.current if session else None
+
+    def _drain(self, session: Session):
+        """Run the session's jobs one after another on this worker"""
+        while True:
+            with self._lock:
+                job = session.current
+            self._run(session, job)
+            with self._lock:
+                finished = [j for j in session.jobs.values() if j.done]
+                for old in finished[: max(len(finished) - KEPT_JOBS, 0)]:
+                    del session.jobs[old.id]
+                session.current = session.queue.popleft() if session.queue else None
+                if session.current is None:
+                    session.used = time.monotonic()
+                    break
+        self._unload_idle()
+
+    def _unload_idle(self):
+        """Forget the least recently used idle sessions past SESSIONS_IN_MEMORY,
+        their checkpoints bring them back"""
+        if not self.checkpointer():
+            return
+        with self._lock:
+            idle = sorted(
+                (s for s in self._sessions.values() if s.idle), key=lambda s: s.used
+            )
+            for session in idle[: max(len(self._sessions) - SESSIONS_IN_MEMORY, 0)]:
+                del self._sessions[session.id]
+
+    def _run(self, session: Session, job: Job):
+        job.status = RUNNING
+        job.started = time.time()
+        state = {"messages": []}
+        checkpointer = self.checkpointer()
+        try:
+            if checkpointer:
+                checkpointer.clear_failure(session.thread_id)
+            conversation = self.conversation(session)
+            if job.message is None:
+                # Continue from the last checkpoint instead of a new input
+                input = None
+            else:
+                conversation.add(job.message)
+                input = {"messages": conversation.history()}
+            stream = self.graph().stream(
+                input, config=session.config, stream_mode=["custom", "values"]
+            )
+            for mode, chunk in stream:
+                if mode == "values":
+                    state = chunk
+                else:
+                    job._publish(chunk)
+            conversation.sync(state["messages"])
+            job._finish(DONE, result=state)
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+            if checkpointer:
+                # Keeps resume() from re-running it on the next page load
+                checkpointer.put_failure(session.thread_id, error)
+            job._finish(FAILED, error=error)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "running": sum(1 for s in sessions if s.current is not None),
+            "queued": sum(len(s.queue) for s in sessions),
+        }
+
+
+_service: Optional[ExecutionService] = None
+_service_lock = threading.Lock()
+
+
+def get_execution_service() -> ExecutionService:
+    """The process-wide service, its graph is compiled on first use"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            # The graph and everything it imports load with the first run
+            from runnable import get_runnable
+
+            _service = ExecutionService(get_runnable)
+        return _service
@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+FILE_CACHE_BYTES = int(os.getenv("FILE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+Signature = Tuple[int, int, int]  # (mtime_ns, size, inode)
+
+
+def file_signature(stat: os.stat_result) -> Signature:
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class FileCache:
+    """Process-wide LRU cache of decoded file contents, bounded in bytes"""
+
+    def __init__(self, max_bytes: int = FILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Signature, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _store(self, path: str, signature: Signature, content: str):
+        self._remove(path)
+        size = signature[1]
+        if size > self.max_bytes:
+            return
+        self._entries[path] = (signature, content)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (old_signature, _) = self._entries.popitem(last=False)
+            self._bytes -= old_signature[1]
+            self.evictions += 1
+
+    def _remove(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[0][1]
+
+    def get(self, path: str) -> Optional[str]:
+        """Cached content of `path` if it is still current on disk"""
+        path = os.path.normpath(path)
+        try:
+            signature = file_signature(os.stat(path))
+        except OSError:
+            self.invalidate(path)
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def read(self, path: str) -> str:
+        """Return the content of `path`, from the cache when it is still valid"""
+        path = os.path.normpath(path)
+        content = self.get(path)
+        if content is not None:
+            return content
+
+        with open(path, "r", encoding="utf-8") as file:
+            signature = file_signature(os.fstat(file.fileno()))
+            content = file.read()
+        with self._lock:
+            self.misses += 1
+            self._store(path, signature, content)
+        return content
+
+    def put(self, path: str, content: str):
+        """Write-through: record `content` as just written to `path`"""
+        path = os.path.normpath(path)
+        try:
+            signature = file_signature(os.stat(path))
+        except OSError:
+            self.invalidate(path)
+            return
+        with self._lock:
+            self._store(path, signature, content)
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._remove(os.path.normpath(path))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+file_cache = FileCache()
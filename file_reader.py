@@ -0,0 +1,188 @@
+import os
+from typing import Optional, Tuple
+
+from file_cache import file_cache
+
+# Whole-file reads above this size return a head/tail preview instead
+READ_MAX_BYTES = int(os.getenv("READ_MAX_BYTES", str(100 * 1024)))
+PREVIEW_LINES = int(os.getenv("READ_PREVIEW_LINES", "80"))
+CHUNK_SIZE = 1024 * 1024
+BINARY_SNIFF_BYTES = 8192
+
+
+def is_binary(path: str) -> bool:
+    with open(path, "rb") as file:
+        return b"\0" in file.read(BINARY_SNIFF_BYTES)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+
+def _count_newlines(file, chunk_size: int = CHUNK_SIZE) -> Tuple[int, bytes]:
+    """Count newlines from the current position, returns (count, last byte)"""
+    count, last = 0, b""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return count, last
+        count += chunk.count(b"\n")
+        last = chunk[-1:]
+
+
+def count_lines(path: str) -> int:
+    with open(path, "rb") as file:
+        count, last = _count_newlines(file)
+    return count + (1 if last and last != b"\n" else 0)
+
+
+def _tail(path: str, lines: int, chunk_size: int = CHUNK_SIZE) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= lines:
+            step = min(chunk_size, position)
+            position -= step
+            file.seek(position)
+            data = file.read(step) + data
+    return b"".join(data.splitlines(keepends=True)[-lines:])
+
+
+def _head(path: str, lines: int) -> bytes:
+    out = []
+    with open(path, "rb") as file:
+        for line in file:
+            out.append(line)
+            if len(out) >= lines:
+                break
+    return b"".join(out)
+
+
+def read_preview(path: str, size: int) -> str:
+    """Head and tail of a file too large to return whole"""
+    total = count_lines(path)
+    head = _decode(_head(path, PREVIEW_LINES))
+    tail = _decode(_tail(path, PREVIEW_LINES))
+    omitted = max(total - 2 * PREVIEW_LINES, 0)
+    return (
+        f"[File is {size} bytes / {total} lines, larger than the {READ_MAX_BYTES} "
+        f"byte read limit. Showing the first and last {PREVIEW_LINES} lines, "
+        f"use startLine/endLine or byteOffset/byteLength to read the rest.]\n"
+        f"{head}"
+        f"\n... [{omitted} lines omitted] ...\n\n"
+        f"{tail}"
+    )
+
+
+def read_line_range(path: str, start: int = 1, end: Optional[int] = None) -> str:
+    """Lines `start`..`end` (1-based, inclusive), streamed from disk"""
+    start = max(start, 1)
+    selected = []
+    size = 0
+    truncated = False
+    # Byte offset of the first selected line
+    offset = 0
+    with open(path, "rb") as file:
+        consumed = 0
+        for consumed, line in enumerate(file, start=1):
+            if consumed < start:
+                offset += len(line)
+                continue
+            if end is not None and consumed > end:
+                break
+            if size + len(line) > READ_MAX_BYTES:
+                truncated = True
+                if not selected:
+                    selected.append(line[:READ_MAX_BYTES])
+                break
+            selected.append(line)
+            size += len(line)
+        rest, last = _count_newlines(file)
+
+    total = consumed + rest + (1 if last and last != b"\n" else 0)
+    if start > total:
+        return f"[File has {total} lines, nothing to show from line {start}]"
+    if truncated and size == 0:
+        # The first line alone is over the limit, show its start
+        return (
+            f"[Line {start} of {total}, its first {READ_MAX_BYTES} bytes. The line "
+            f"is longer than the read limit, continue with "
+            f"byteOffset={offset + READ_MAX_BYTES}]\n" + _decode(selected[0])
+        )
+    end = start + len(selected) - 1
+    header = f"[Lines {start}-{end} of {total}"
+    if truncated:
+        header += f", cut at the {READ_MAX_BYTES} byte read limit"
+    return header + "]\n" + _decode(b"".join(selected))
+
+
+def _byte_length(length: Optional[int]) -> int:
+    if length is None:
+        return READ_MAX_BYTES
+    if length <= 0:
+        raise ValueError(f"byteLength must be positive, got {length}")
+    return min(length, READ_MAX_BYTES)
+
+
+def read_byte_range(path: str, offset: int = 0, length: Optional[int] = None) -> str:
+    size = os.path.getsize(path)
+    length = _byte_length(length)
+    with open(path, "rb") as file:
+        file.seek(max(offset, 0))
+        data = file.read(length)
+    end = max(offset, 0) + len(data)
+    return f"[Bytes {offset}-{end} of {size}]\n" + _decode(data)
+
+
+def read_text(path: str) -> str:
+    """Whole file through the shared cache, or a preview if it is too large"""
+    cached = file_cache.get(path)
+    if cached is not None and len(cached) <= READ_MAX_BYTES:
+        return cached
+
+    size = os.path.getsize(path)
+    if is_binary(path):
+        return f"[Binary file, {size} bytes, content not shown]"
+    if size > READ_MAX_BYTES:
+        return read_preview(path, size)
+    return file_cache.read(path)
+
+
+def read_pending(
+    content: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+) -> str:
+    """Same views as the readers above, over content not yet on disk"""
+    if offset is not None or length is not None:
+        data = content.encode("utf-8")
+        offset = max(offset or 0, 0)
+        chunk = data[offset : offset + _byte_length(length)]
+        end_byte = offset + len(chunk)
+        return f"[Bytes {offset}-{end_byte} of {len(data)}]\n" + _decode(chunk)
+
+    lines = content.splitlines(keepends=True)
+    if start is not None or end is not None:
+        start = max(start or 1, 1)
+        if start > len(lines):
+            return f"[File has {len(lines)} lines, nothing to show from line {start}]"
+        selected = lines[start - 1 : end]
+        end = start + len(selected) - 1
+        return f"[Lines {start}-{end} of {len(lines)}]\n" + "".join(selected)
+
+    size = len(content.encode("utf-8"))
+    if size <= READ_MAX_BYTES:
+        return content
+    omitted = max(len(lines) - 2 * PREVIEW_LINES, 0)
+    return (
+        f"[File is {size} bytes / {len(lines)} lines, larger than the "
+        f"{READ_MAX_BYTES} byte read limit. Showing the first and last "
+        f"{PREVIEW_LINES} lines, use startLine/endLine or byteOffset/byteLength "
+        f"to read the rest.]\n"
+        f"{''.join(lines[:PREVIEW_LINES])}"
+        f"\n... [{omitted} lines omitted] ...\n\n"
+        f"{''.join(lines[-PREVIEW_LINES:])}"
+    )
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from file_cache import Signature, file_signature
+
+RESOLVE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+CONFIG_FILES = ("tsconfig.json", "jsconfig.json")
+
+IMPORT = re.compile(
+    r"""(?:^|[\s;])(?:import|export)\s+(?:type\s+)?(?:[\w*{}\s,$]+\s+from\s+)?"""
+    r"""["']([^"'\n]+)["']"""
+    r"""|\b(?:require|import)\s*\(\s*["']([^"'\n]+)["']\s*\)""",
+    re.MULTILINE,
+)
+# Strings are matched first so "//" or "/*" inside them is kept
+JSON_COMMENT = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+Alias = Tuple[str, List[str]]
+
+
+def parse_imports(content: str) -> List[str]:
+    """Module specifiers of static, re-export, dynamic and require imports"""
+    found = []
+    for match in IMPORT.finditer(content):
+        specifier = match.group(1) or match.group(2)
+        if specifier not in found:
+            found.append(specifier)
+    return found
+
+
+def load_jsonc(path: str) -> dict:
+    """tsconfig-style JSON: comments and trailing commas allowed"""
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    text = JSON_COMMENT.sub(lambda m: m.group(1) or "", text)
+    return json.loads(TRAILING_COMMA.sub(r"\1", text))
+
+
+class ImportGraph:
+    """First-degree dependencies of project source files, resolved through
+    relative paths and tsconfig/jsconfig `paths` aliases, cached per file"""
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        self._deps: Dict[str, Tuple[Signature, List[str]]] = {}
+        # (tsconfig signature, [(pattern, [absolute target patterns])])
+        self._aliases: Optional[Tuple[Optional[Signature], List[Alias]]] = None
+        self._lock = threading.Lock()
+
+    def _config(self) -> Tuple[Optional[str], Optional[Signature]]:
+        for name in CONFIG_FILES:
+            path = os.path.join(self.root, name)
+            try:
+                return path, file_signature(os.stat(path))
+            except OSError:
+                continue
+        return None, None
+
+    def aliases(self) -> List[Alias]:
+        """[(pattern, [absolute target patterns])] from compilerOptions.paths"""
+        path, signature = self._config()
+        with self._lock:
+            if self._aliases is not None and self._aliases[0] == signature:
+                return self._aliases[1]
+        aliases: List[Alias] = []
+        if path:
+            try:
+                options = load_jsonc(path).get("compilerOptions") or {}
+            except (OSError, ValueError) as e:
+                print(f"Could not read {path}: {e}")
+                options = {}
+            base = os.path.join(self.root, options.get("baseUrl") or ".")
+            for pattern, targets in (options.get("paths") or {}).items():
+                targets = [os.path.normpath(os.path.join(base, t)) for t in targets]
+                aliases.append((pattern, targets))
+            # Longest prefix first, as TypeScript does
+            aliases.sort(key=lambda alias: len(alias[0].split("*")[0]), reverse=True)
+        with self._lock:
+            self._aliases = (signature, aliases)
+        return aliases
+
+    def _candidates(self, specifier: str, importer: str) -> List[str]:
+        if specifier.startswith("."):
+            directory = os.path.dirname(importer)
+            return [os.path.normpath(os.path.join(directory, specifier))]
+        candidates = []
+        for pattern, targets in self.aliases():
+            prefix, star, suffix = pattern.partition("*")
+            if not star:
+                if specifier == pattern:
+                    candidates.extend(targets)
+                continue
+            if specifier.startswith(prefix) and specifier.endswith(suffix):
+                middle = specifier[len(prefix) : len(specifier) - len(suffix)]
+                candidates.extend(t.replace("*", middle, 1) for t in targets)
+        return candidates
+
+    def resolve(self, specifier: str, importer: str) -> Optional[str]:
+        """Absolute path of the project file `specifier` refers to, None for
+        packages and anything outside the project"""
+        for base in self._candidates(specifier, importer):
+            options = [base]
+            options += [base + ext for ext in RESOLVE_EXTENSIONS]
+            options += [os.path.join(base, f"index{ext}") for ext in RESOLVE_EXTENSIONS]
+            for option in options:
+                if os.path.isfile(option) and option.startswith(self.root + os.sep):
+                    return option
+        return None
+
+    def dependencies(self, file_path: str, content: Optional[str] = None) -> List[str]:
+        """Project files imported by `file_path` (absolute paths)"""
+        file_path = os.path.normpath(file_path)
+        if not file_path.endswith(RESOLVE_EXTENSIONS):
+            return []
+        try:
+            signature = file_signature(os.stat(file_path))
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._deps.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        if content is None:
+            with open(file_path, encoding="utf-8", errors="replace") as file:
+                content = file.read()
+        deps = []
+        for specifier in parse_imports(content):
+            resolved = self.resolve(specifier, file_path)
+            if resolved and resolved != file_path and resolved not in deps:
+                deps.append(resolved)
+        with self._lock:
+            self._deps[file_path] = (signature, deps)
+        return deps
+
+    def note_write(self, file_path: str):
+        with self._lock:
+            self._deps.pop(os.path.normpath(file_path), None)
+
+
+_graphs: Dict[str, ImportGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_import_graph(root: str) -> ImportGraph:
+    """Return the shared import graph for `root`, creating it on first use"""
+    key = os.path.normpath(root)
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is None:
+            graph = _graphs[key] = ImportGraph(key)
+        return graph
+
+
+def note_write(file_path: str):
+    """Drop the cached imports of a written file"""
+    path = os.path.normpath(file_path)
+    with _graphs_lock:
+        graphs = list(_graphs.values())
+    for graph in graphs:
+        if path.startswith(graph.root + os.sep):
+            graph.note_write(path)
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    convert_to_messages,
+    messages_from_dict,
+    messages_to_dict,
+)
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# off: always call the model, readwrite: serve hits and store misses,
+# replay: serve hits only and fail on a miss (offline, deterministic runs)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0"))  # seconds, 0 = no expiry
+LLM_CACHE_MAX_BYTES = int(
+    os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+
+MODEL_PARAMS = ("model", "temperature", "top_p", "top_k", "max_output_tokens", "n")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a request has no cached response"""
+
+
+def _message_key(message: BaseMessage) -> Dict[str, Any]:
+    data = {"type": message.type, "content": message.content}
+    for attr in ("tool_calls", "tool_call_id", "name"):
+        value = getattr(message, attr, None)
+        if value:
+            data[attr] = value
+    if data.get("tool_calls"):
+        data["tool_calls"] = [
+            {"name": call["name"], "args": call["args"]}
+            for call in data["tool_calls"]
+        ]
+    return data
+
+
+def _tool_key(tool: Any) -> Any:
+    try:
+        return convert_to_openai_tool(tool)
+    except Exception:
+        return repr(tool)
+
+
+def model_params(client: Any) -> Dict[str, Any]:
+    return {
+        name: getattr(client, name)
+        for name in MODEL_PARAMS
+        if getattr(client, name, None) is not None
+    }
+
+
+def request_key(
+    input: Any, tools: Optional[Sequence[Any]], params: Dict[str, Any]
+) -> str:
+    """Canonical hash of the messages, bound tool schemas and model parameters"""
+    messages = convert_to_messages([input] if isinstance(input, str) else input)
+    payload = {
+        "messages": [_message_key(message) for message in messages],
+        "tools": [_tool_key(tool) for tool in tools or []],
+        "params": params,
+    }
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def dump_response(response: BaseMessage) -> str:
+    """JSON of a model response stored as a plain AIMessage, streamed
+    responses arrive as merged chunks"""
+    message = AIMessage(
+        content=response.content,
+        tool_calls=getattr(response, "tool_calls", None) or [],
+        response_metadata=getattr(response, "response_metadata", {}) or {},
+        usage_metadata=getattr(response, "usage_metadata", None),
+    )
+    return json.dumps(messages_to_dict([message]), default=str)
+
+
+def load_response(data: str) -> BaseMessage:
+    return messages_from_dict(json.loads(data))[0]
+
+
+class LLMCache:
+    """SQLite-backed store of model responses with TTL and size eviction"""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        mode: str = LLM_CACHE_MODE,
+        ttl: float = LLM_CACHE_TTL,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ):
+        if mode not in ("off", "readwrite", "replay"):
+            raise ValueError(f"Unknown LLM cache mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row and self.ttl and now - row[1] > self.ttl:
+                if self.mode == "readwrite":
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                if self.mode == "replay":
+                    raise LLMCacheMiss(f"No cached response for {key[:12]}")
+                return None
+            self.hits += 1
+            if self.mode == "readwrite":
+                conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                conn.commit()
+        return load_response(row[0])
+
+    def put(self, key: str, response: BaseMessage):
+        if self.mode != "readwrite":
+            return
+        data = dump_response(response)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl:
+            expired = now - self.ttl
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (expired,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+        total = total.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first until the store fits again
+        freed = 0
+        stale = []
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+        for key, size in rows.fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,288 @@
+import contextvars
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from tracing import add, annotate, count
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "5"))  # 0 = unlimited
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # seconds per attempt
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # 0 = no hedging
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+    "ServerError",
+    "RemoteDisconnected",
+    "ReadTimeout",
+    "ConnectTimeout",
+}
+
+
+class CallTimeout(TimeoutError):
+    """An attempt ran past its deadline"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        value = value() if callable(value) else value
+        value = getattr(value, "value", value)  # grpc / http enums
+        if isinstance(value, tuple):
+            value = value[0]
+        if value in RETRYABLE_STATUS:
+            return True
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & RETRYABLE_NAMES:
+        return True
+    message = str(error)
+    return "429" in message or "Resource has been exhausted" in message
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class _Lease:
+    """One attempt's concurrency slot, given back exactly once, also when the
+    attempt is abandoned (deadline, lost hedge) while still running"""
+
+    def __init__(self, slots: threading.BoundedSemaphore):
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._held = False
+        self._abandoned = False
+
+    def acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            if not self._abandoned:
+                self._held = True
+                return
+        self._slots.release()
+        raise CallTimeout("Attempt abandoned before it started")
+
+    def release(self):
+        with self._lock:
+            held, self._held = self._held, False
+        if held:
+            self._slots.release()
+
+    def abandon(self):
+        with self._lock:
+            self._abandoned = True
+        self.release()
+
+
+class ManagedClient:
+    """Chat model wrapper with bounded concurrency, rate limiting, retries,
+    per-attempt deadlines and optional hedged requests"""
+
+    def __init__(
+        self,
+        model: "BaseChatModel",
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_second: float = LLM_RATE_PER_SECOND,
+        burst: int = LLM_RATE_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT,
+        hedge_after: float = LLM_HEDGE_AFTER,
+    ):
+        self.model = model
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_second, burst)
+        # Attempts run on their own threads so a stalled call can be abandoned
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency * 2, thread_name_prefix="llm"
+        )
+        self._bindings: Dict[Tuple, Any] = {}
+        self._bindings_lock = threading.Lock()
+
+    def bound(self, tools: Optional[Sequence[Any]] = None):
+        """Model with `tools` bound, bindings are built once per tool set"""
+        if not tools:
+            return self.model
+        key = tuple(getattr(tool, "name", None) or id(tool) for tool in tools)
+        with self._bindings_lock:
+            runnable = self._bindings.get(key)
+            if runnable is None:
+                runnable = self._bindings[key] = self.model.bind_tools(tools)
+            return runnable
+
+    def _submit(self, fn, *args):
+        # Keep the caller's context (run config, callbacks) on the worker thread
+        return self._pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def _attempt(self, lease: _Lease, runnable, input) -> BaseMessage:
+        self._bucket.acquire()
+        lease.acquire()
+        try:
+            return runnable.invoke(input)
+        finally:
+            lease.release()
+
+    def _invoke_once(self, runnable, input, hedge: bool) -> BaseMessage:
+        leases = [_Lease(self._slots)]
+        futures = {self._submit(self._attempt, leases[0], runnable, input)}
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            if hedge and self.hedge_after:
+                done, _ = wait(futures, timeout=self.hedge_after)
+                if not done:
+                    leases.append(_Lease(self._slots))
+                    futures.add(
+                        self._submit(self._attempt, leases[-1], runnable, input)
+                    )
+
+            error: Optional[BaseException] = None
+            while futures:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                done, futures = wait(
+                    futures, timeout=remaining, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            if error is not None and not futures:
+                raise error
+            raise CallTimeout(f"Model call exceeded {self.timeout}s")
+        finally:
+            # Attempts still running no longer count against the concurrency
+            # limit, the model's own timeout ends them
+            for lease in leases:
+                lease.abandon()
+
+    def _note_retry(self, error: BaseException):
+        add("llm_retries", 1)
+        annotate(llm_retry_error=type(error).__name__)
+        count("llm_retries")
+
+    def _backoff(self, attempt: int):
+        # Full jitter: spreads retries of concurrent callers apart
+        ceiling = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2**attempt)
+        time.sleep(random.uniform(0, ceiling))
+
+    def invoke(
+        self, input, tools: Optional[Sequence[Any]] = None, hedge: bool = True
+    ) -> BaseMessage:
+        runnable = self.bound(tools)
+        attempt = 0
+        while True:
+            try:
+                return self._invoke_once(runnable, input, hedge)
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable(error):
+                    raise
+                self._note_retry(error)
+                self._backoff(attempt)
+                attempt += 1
+
+    def stream(self, input, tools: Optional[Sequence[Any]] = None) -> Iterator[Any]:
+        """Stream chunks, retrying only while nothing has been yielded yet"""
+        runnable = self.bound(tools)
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self._stream_once(runnable, input):
+                    started = True
+                    yield chunk
+                return
+            except Exception as error:
+                retryable = not started and is_retryable(error)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                self._note_retry(error)
+                self._backoff(attempt)
+                attempt += 1
+
+    def _stream_once(self, runnable, input) -> Iterator[Any]:
+        chunks: "queue.Queue" = queue.Queue()
+        done = object()
+        cancelled = threading.Event()
+        lease = _Lease(self._slots)
+
+        def produce():
+            try:
+                self._bucket.acquire()
+                lease.acquire()
+                try:
+                    for chunk in runnable.stream(input):
+                        if cancelled.is_set():
+                            return
+                        chunks.put(chunk)
+                finally:
+                    lease.release()
+                chunks.put(done)
+            except BaseException as error:
+                chunks.put(error)
+
+        self._submit(produce)
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise CallTimeout(f"Model stream exceeded {self.timeout}s")
+                try:
+                    item = chunks.get(timeout=remaining)
+                except queue.Empty:
+                    raise CallTimeout(f"Model stream exceeded {self.timeout}s")
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            lease.abandon()
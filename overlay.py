@@ -0,0 +1,297 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+# Rollback journals and backups live here, inside the workspace so that
+# renames and hard links stay on one filesystem
+JOURNAL_DIR = ".agent-journal"
+
+
+def _fsync_dir(path: str):
+    # Directory fsync makes renames durable, not supported everywhere
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _lock(file, blocking: bool = True) -> bool:
+    """Exclusive lock on an open file, released by the OS if the process dies.
+    False if `blocking` is off and another handle holds it."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+            msvcrt.locking(file.fileno(), mode, 1)
+        else:
+            import fcntl
+
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(file.fileno(), flags)
+    except OSError:
+        if blocking:
+            raise
+        return False
+    return True
+
+
+def _unlock(file, path: Optional[str] = None):
+    """Release and close a file locked by _lock(), then remove `path` if given"""
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+    finally:
+        file.close()
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _backup(path: str, backup: str):
+    try:
+        os.link(path, backup)
+    except OSError:
+        shutil.copy2(path, backup)
+
+
+class WriteOverlay:
+    """Copy-on-write layer over the workspace for one builder run.
+
+    Edits are kept in memory until commit(), reads of an edited path see the
+    pending content. commit() writes every file to a temp file, fsyncs them in
+    one pass, records a rollback journal and renames them into place; if a
+    rename fails the journal restores the previous files.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        self.id = uuid.uuid4().hex[:12]
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def read(self, path: str) -> Optional[str]:
+        """Pending content of `path`, None if it has not been edited"""
+        with self._lock:
+            return self._pending.get(os.path.normpath(path))
+
+    def write(self, path: str, content: str):
+        with self._lock:
+            self._pending[os.path.normpath(path)] = content
+
+    def paths(self) -> List[str]:
+        with self._lock:
+            return list(self._pending)
+
+    def discard(self):
+        with self._lock:
+            self._pending.clear()
+
+    def commit(self, on_write: Optional[Callable[[str, str], None]] = None):
+        """Write every pending file atomically, `on_write(path, content)`
+        is called for each once all of them are in place"""
+        with self._lock:
+            pending = dict(self._pending)
+            self._pending.clear()
+        if not pending:
+            return
+
+        # The lock file is held until the journal is gone, so recovery can
+        # tell a live commit from a crashed one. It exists before the journal.
+        journal_dir = os.path.join(self.root, JOURNAL_DIR, self.id)
+        os.makedirs(os.path.dirname(journal_dir), exist_ok=True)
+        lock_path = f"{journal_dir}.lock"
+        lock = open(lock_path, "wb")
+        try:
+            _lock(lock)
+            os.makedirs(journal_dir, exist_ok=True)
+            self._commit(pending, journal_dir)
+        finally:
+            _unlock(lock, lock_path)
+
+        if on_write:
+            for path, content in pending.items():
+                on_write(path, content)
+
+    def _commit(self, pending: Dict[str, str], journal_dir: str):
+        temps: Dict[str, str] = {}
+        entries = []
+        try:
+            # 1. Temp files next to their targets, then one fsync pass
+            for index, (path, content) in enumerate(pending.items()):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp = f"{path}.{self.id}.tmp"
+                with open(temp, "w", encoding="utf-8") as file:
+                    file.write(content)
+                temps[path] = temp
+                backup = None
+                if os.path.exists(path):
+                    backup = os.path.join(journal_dir, str(index))
+                    _backup(path, backup)
+                entries.append({"path": path, "backup": backup})
+            for temp in temps.values():
+                fd = os.open(temp, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+            # 2. Journal, so a crash during the renames can be rolled back
+            journal = os.path.join(journal_dir, "journal.json")
+            with open(journal, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            # 3. Atomic renames
+            renamed = []
+            try:
+                for path, temp in temps.items():
+                    os.replace(temp, path)
+                    renamed.append(path)
+            except BaseException:
+                _rollback([e for e in entries if e["path"] in renamed])
+                raise
+            for directory in {os.path.dirname(path) for path in temps}:
+                _fsync_dir(directory)
+        finally:
+            for temp in temps.values():
+                if os.path.exists(temp):
+                    os.remove(temp)
+            shutil.rmtree(journal_dir, ignore_errors=True)
+
+
+def _rollback(entries: List[dict]):
+    for entry in entries:
+        if entry["backup"] and os.path.exists(entry["backup"]):
+            os.replace(entry["backup"], entry["path"])
+        elif not entry["backup"] and os.path.exists(entry["path"]):
+            os.remove(entry["path"])
+
+
+def recover(root: str):
+    """Roll back commits that were interrupted mid-rename (e.g. a crash).
+
+    Journals whose lock file is still held are skipped, another session
+    may be committing into the same workspace right now.
+    """
+    base = os.path.join(root, JOURNAL_DIR)
+    if not os.path.isdir(base):
+        return
+    for name in os.listdir(base):
+        # A lock file without its journal belongs to a commit that is just
+        # starting (or died right after finishing), it is not touched
+        if not name.endswith(".lock"):
+            _recover_journal(base, name)
+
+
+def _recover_journal(base: str, name: str):
+    journal_dir = os.path.join(base, name)
+    lock_path = f"{journal_dir}.lock"
+    lock = None
+    if os.path.exists(lock_path):
+        lock = open(lock_path, "ab")
+        if not _lock(lock, blocking=False):
+            lock.close()
+            return
+    if not os.path.isdir(journal_dir):
+        # Finished while we were getting the lock
+        if lock is not None:
+            _unlock(lock)
+        return
+    try:
+        journal = os.path.join(journal_dir, "journal.json")
+        try:
+            with open(journal, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = []  # crashed before the journal was complete, nothing renamed
+        print(f"Rolling back interrupted write batch {name}")
+        _rollback(entries)
+        # Older journals were named "<pid>-<batch id>"
+        batch_id = name.rpartition("-")[2]
+        for entry in entries:
+            temp = f"{entry['path']}.{batch_id}.tmp"
+            if os.path.exists(temp):
+                os.remove(temp)
+        shutil.rmtree(journal_dir, ignore_errors=True)
+    finally:
+        if lock is not None:
+            _unlock(lock, lock_path)
+
+
+_recovered: Set[str] = set()
+_recovered_lock = threading.Lock()
+
+
+def recover_once(root: str):
+    """recover() the first time a process uses `root`"""
+    root = os.path.normpath(root)
+    with _recovered_lock:
+        if root in _recovered:
+            return
+        recover(root)
+        _recovered.add(root)
+
+
+_active: ContextVar[Optional[WriteOverlay]] = ContextVar("write_overlay", default=None)
+
+
+def active_overlay() -> Optional[WriteOverlay]:
+    return _active.get()
+
+
+def pending_content(path: str) -> Optional[str]:
+    """Uncommitted content of `path` in the current overlay, if any"""
+    overlay = _active.get()
+    return overlay.read(path) if overlay is not None else None
+
+
+def stage_write(path: str, content: str) -> bool:
+    """Record a write in the current overlay, False if there is none"""
+    overlay = _active.get()
+    if overlay is None:
+        return False
+    overlay.write(path, content)
+    return True
+
+
+@contextmanager
+def transaction(
+    root: str, on_write: Optional[Callable[[str, str], None]] = None
+) -> Iterator[WriteOverlay]:
+    """Scope an overlay to a block: committed if it completes, discarded if
+    it raises. Nested transactions join the outer one."""
+    outer = _active.get()
+    if outer is not None:
+        yield outer
+        return
+    recover_once(root)
+    overlay = WriteOverlay(root)
+    token = _active.set(overlay)
+    try:
+        yield overlay
+    except BaseException:
+        overlay.discard()
+        raise
+    finally:
+        _active.reset(token)
+    overlay.commit(on_write)
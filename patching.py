@@ -0,0 +1,228 @@
+import difflib
+import re
+from typing import Callable, Iterable, List, NamedTuple, Optional, Sequence
+
+# How far (in lines) from the expected position a hunk may have moved
+SEARCH_WINDOW = 2000
+# Context lines that may be dropped from each end of a hunk (GNU patch "fuzz")
+MAX_FUZZ = 2
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """A patch, search block or line range did not apply cleanly"""
+
+
+class Hunk(NamedTuple):
+    start: Optional[int]  # 1-based line in the original, None if unknown
+    old: List[str]
+    new: List[str]
+
+
+def _exact(line: str) -> str:
+    return line
+
+
+def _loose(line: str) -> str:
+    # Ignore indentation and trailing whitespace differences
+    return " ".join(line.split())
+
+
+def _find(
+    lines: Sequence[str],
+    block: Sequence[str],
+    expected: int,
+    normalize: Callable[[str], str],
+    window: int = SEARCH_WINDOW,
+) -> List[int]:
+    """Positions of `block` in `lines` within `window` lines of `expected`,
+    nearest first"""
+    if not block:
+        return [min(max(expected, 0), len(lines))]
+    target = [normalize(line) for line in block]
+    first = target[0]
+    low = max(0, expected - window)
+    high = min(len(lines) - len(block), expected + window)
+    found = []
+    for index in range(low, high + 1):
+        if normalize(lines[index]) != first:
+            continue
+        if all(
+            normalize(lines[index + k]) == target[k] for k in range(1, len(block))
+        ):
+            found.append(index)
+    return sorted(found, key=lambda index: abs(index - expected))
+
+
+def parse_unified_diff(diff: str) -> List[Hunk]:
+    """Hunks of a unified diff, file headers (---/+++) are ignored
+
+    Hunk bodies are as long as their header's line counts say, so a removed
+    line that starts with "-- " is not mistaken for a header. Without counts
+    ("@@ ... @@" only) a hunk runs to the next one.
+    """
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    # Lines still expected in the current hunk, None when the header has no counts
+    old_left: Optional[int] = None
+    new_left: Optional[int] = None
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            current = Hunk(int(match.group(1)) if match else None, [], [])
+            hunks.append(current)
+            if match:
+                old_left = int(match.group(2) or 1)
+                new_left = int(match.group(4) or 1)
+            else:
+                old_left = new_left = None
+            continue
+        in_hunk = current is not None and (
+            old_left is None or old_left > 0 or new_left > 0
+        )
+        if not in_hunk or line.startswith("\\"):
+            continue
+        if line.startswith("-"):
+            current.old.append(line[1:])
+            old_left = old_left - 1 if old_left is not None else None
+        elif line.startswith("+"):
+            current.new.append(line[1:])
+            new_left = new_left - 1 if new_left is not None else None
+        else:
+            # Context; a blank line is context whose leading space got stripped
+            text = line[1:] if line.startswith(" ") else line
+            current.old.append(text)
+            current.new.append(text)
+            if old_left is not None:
+                old_left, new_left = old_left - 1, new_left - 1
+    if not hunks:
+        raise PatchError("No hunks found, expected '@@ -a,b +c,d @@' headers.")
+    return hunks
+
+
+def _context_lines(old: List[str], new: List[str]) -> int:
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks())
+
+
+def _trim_context(hunk: Hunk, fuzz: int) -> Optional[Hunk]:
+    """Drop up to `fuzz` unchanged lines from both ends of the hunk, always
+    keeping one so the hunk is still anchored to something in the file"""
+    old, new = list(hunk.old), list(hunk.new)
+    context = _context_lines(old, new)
+    head = tail = 0
+    while head < fuzz and context > 1 and old and new and old[0] == new[0]:
+        old.pop(0), new.pop(0)
+        head += 1
+        context -= 1
+    while tail < fuzz and context > 1 and old and new and old[-1] == new[-1]:
+        old.pop(), new.pop()
+        tail += 1
+        context -= 1
+    if not head and not tail:
+        return None
+    start = hunk.start + head if hunk.start is not None else None
+    return Hunk(start, old, new)
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """Apply every hunk of `diff`, or raise PatchError naming the first that
+    does not match. Hunks are located near their stated line (adjusted for
+    earlier hunks), ignoring whitespace changes and, failing that, with up to
+    MAX_FUZZ context lines dropped from each end."""
+    lines = original.splitlines()
+    offset = 0
+    for number, hunk in enumerate(parse_unified_diff(diff), start=1):
+        attempts = [hunk] + [
+            trimmed
+            for fuzz in range(1, MAX_FUZZ + 1)
+            if (trimmed := _trim_context(hunk, fuzz)) is not None
+        ]
+        position = None
+        for attempt in attempts:
+            # "-N,0" (nothing removed) inserts after line N, otherwise the
+            # hunk starts at line N
+            start = attempt.start or 0
+            expected = (start if not attempt.old else max(start - 1, 0)) + offset
+            for normalize in (_exact, _loose):
+                matches = _find(lines, attempt.old, expected, normalize)
+                if matches and (attempt.start is not None or len(matches) == 1):
+                    position = matches[0]
+                    break
+            if position is not None:
+                break
+        if position is None:
+            preview = "\n".join(hunk.old[:5])
+            raise PatchError(
+                f"Hunk {number} did not apply, its context/removed lines were "
+                f"not found:\n{preview}"
+            )
+        lines[position : position + len(attempt.old)] = _merge(
+            lines[position : position + len(attempt.old)], attempt
+        )
+        offset += len(attempt.new) - len(attempt.old)
+    return _join(lines, original)
+
+
+def apply_search_replace(original: str, edits: Iterable) -> str:
+    """Replace each `search` text with `replace`, in order. Each search must
+    match exactly once; whitespace differences are tolerated line by line."""
+    content = original
+    for number, edit in enumerate(edits, start=1):
+        search, replace = _field(edit, "search"), _field(edit, "replace")
+        if not search:
+            raise PatchError(f"Edit {number} has an empty search text.")
+        occurrences = content.count(search)
+        if occurrences == 1:
+            content = content.replace(search, replace, 1)
+            continue
+        if occurrences > 1:
+            raise PatchError(
+                f"Edit {number} matches {occurrences} places, add surrounding "
+                "lines to make the search text unique."
+            )
+        lines = content.splitlines()
+        block = search.strip("\n").splitlines()
+        matches = []
+        if len(block) <= len(lines):
+            matches = _find(lines, block, 0, _loose, window=len(lines))
+        if len(matches) != 1:
+            problem = "matches several places" if matches else "was not found"
+            raise PatchError(f"Edit {number}: search text {problem}:\n{search[:300]}")
+        lines[matches[0] : matches[0] + len(block)] = replace.strip("\n").splitlines()
+        content = _join(lines, content)
+    return content
+
+
+def apply_line_range(original: str, start: int, end: Optional[int], text: str) -> str:
+    """Replace lines start..end (1-based, inclusive) with `text`. end = start - 1
+    inserts before `start`, a start past the last line appends."""
+    lines = original.splitlines()
+    end = len(lines) if end is None else end
+    if start < 1 or end < start - 1 or start > len(lines) + 1:
+        raise PatchError(
+            f"Invalid line range {start}-{end}, the file has {len(lines)} lines."
+        )
+    lines[start - 1 : min(end, len(lines))] = text.splitlines()
+    return _join(lines, original)
+
+
+def _merge(matched: List[str], hunk: Hunk) -> List[str]:
+    """hunk.new, keeping the file's own text for context lines (which may
+    differ in whitespace from the hunk's)"""
+    merged: List[str] = []
+    matcher = difflib.SequenceMatcher(a=hunk.old, b=hunk.new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        merged.extend(matched[i1:i2] if tag == "equal" else hunk.new[j1:j2])
+    return merged
+
+
+def _join(lines: List[str], original: str) -> str:
+    newline = "\r\n" if "\r\n" in original else "\n"
+    trailing = newline if original.endswith(("\n", "\r")) or not original else ""
+    return newline.join(lines) + (trailing if lines else "")
+
+
+def _field(edit, name: str) -> str:
+    return edit.get(name, "") if isinstance(edit, dict) else getattr(edit, name, "")
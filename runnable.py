@@ -3,7 +3,6 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
 from typing_extensions import TypedDict
 from typing import Annotated, Literal, Dict, List, Optional, Union, Any
-from dotenv import load_dotenv
 from langchain_core.messages import (
     ToolMessage,
     HumanMessage,
@@ -13,18 +12,20 @@ from langchain_core.messages import (
 )
 import json
 from langgraph.types import Command
-from utils import get_tree, make_llm_call
+from utils import get_tree, make_llm_call, search_snippets
 from tools import (
     builder_tool,
     available_tools,
     get_codebase_content,
+    get_definitions,
 )
+from tool_executor import run_tool_calls
+from context_store import ContextStore
+from artifacts import artifact_store
+from checkpoint import get_checkpointer, node_steps
+from tracing import count, span
 import re
 from pydantic import BaseModel
-import ast
-
-load_dotenv()
-
 
 def extract_final_answer(content):
     """Extract the final answer from between <finalAnswer> tags"""
@@ -40,23 +41,29 @@ class GraphState(BaseModel):
     return_to_agent_node: bool = False
 
 
-count = 0
 AGENT_NODE = "agent_node"
 TOOLS_NODE = "tools_node"
 
 
-def agent_node(state: GraphState) -> Dict[str, AnyMessage]:
+def session_id_from(config: Optional[RunnableConfig]) -> Optional[str]:
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("session_id") or configurable.get("thread_id")
+
+
+def agent_node(state: GraphState, config: RunnableConfig) -> Dict[str, AnyMessage]:
     """Main agent that coordinates responses and delegates to specialized tools/agents"""
-    global count
-    count += 1
+    with span("agent_node", session_id=session_id_from(config)):
+        count("agent_turns")
+        with node_steps(config):
+            return run_agent_turn(state)
+
+
+def run_agent_turn(state: GraphState) -> Dict[str, AnyMessage]:
     state_messages = list(state.messages)
     last_human_message = next(
         (msg for msg in reversed(state_messages) if isinstance(msg, HumanMessage)), None
     )
     return_to_agent_node = state.return_to_agent_node
-    print()
-    print("last_human_message", last_human_message)
-    # print("message", state_messages)
 
     if not last_human_message:
         return Command(
@@ -68,14 +75,29 @@ def agent_node(state: GraphState) -> Dict[str, AnyMessage]:
             },
         )
 
-    tree_structure = get_tree("C:/zeropointlab/user_project")
+    tree_structure = get_tree(query=last_human_message.content)
+
+    # File contents gathered by earlier turns, bounded and deduplicated
+    store = ContextStore(state.context)
+    store.next_turn(query=last_human_message.content)
+    snippets = ""
+    if return_to_agent_node:
+        context = store.render(query=last_human_message.content)
+    else:
+        context = "Nothing Yet."
+        # First look: files a local search ranks highest for the query, often
+        # enough to skip a get_codebase_content round-trip
+        snippets = search_snippets(last_human_message.content)
+    if snippets:
+        snippets = f"Possibly relevant snippets (local search):\n{snippets}"
 
     prompt = f"""
         User Query: {last_human_message.content}
         
         Instructions:
             1. You are a primary agent in an architecture of specialized coding agents.
-            3. Use the get_codebase_content tool freely to examine files before modifying them.
+            3. Use the get_codebase_content tool freely to examine files before modifying them,
+               or get_definitions to fetch just the components, functions or routes you need.
             4. Give intructions to builder_tool at once for making changes to the codebase to fulfill user requirements related to codebase.
             
         Current Codebase:
@@ -86,16 +108,16 @@ def agent_node(state: GraphState) -> Dict[str, AnyMessage]:
             {tree_structure}
             
         Context from previous interactions:
-        {state.context if return_to_agent_node else 'Nothing Yet.'}
+        {context}
+
+        {snippets}
     """
 
-    if count == 4:
-        print("prompt", prompt)
     new_messages = []
 
     response = make_llm_call(
         input=[*state_messages, HumanMessage(content=prompt)],
-        tools=[builder_tool, get_codebase_content],
+        tools=[builder_tool, get_codebase_content, get_definitions],
     )
 
     # print("response.content", response.content)
@@ -108,52 +130,60 @@ def agent_node(state: GraphState) -> Dict[str, AnyMessage]:
         )
     )
 
-    context_updates = {"files_contents": {}}
+    # builder_tool also gets the conversation so far
+    tool_calls = []
     for tool_call in response.tool_calls:
+        if tool_call["name"] == "builder_tool":
+            args = {
+                "detailedQuery": tool_call["args"]["detailedQuery"],
+                "state_messages": state_messages,
+            }
+            tool_call = {**tool_call, "args": args}
+        tool_calls.append(tool_call)
+
+    tool_outputs = run_tool_calls(tool_calls, available_tools)
+
+    needs_follow_up = False
+    for tool_call, output in zip(tool_calls, tool_outputs):
         tool_name = tool_call["name"]
-        tool = available_tools.get(tool_name)
-
-        if tool is None:
-            raise Exception(f"Tool '{tool_name}' not found.")
 
         if tool_name == "builder_tool":
-            tool_msg, ai_msg = builder_tool.invoke(
-                {
-                    "detailedQuery": tool_call["args"]["detailedQuery"],
-                    "state_messages": state_messages,
-                },
-            )
-
-            changes_dict = ast.literal_eval(tool_msg.content)
+            tool_msg, ai_msg = output
 
             new_messages.append(ai_msg)
 
-            for filePath, file_content in changes_dict.items():
-                context_updates["files_contents"][filePath] = file_content
+            # Builder results reference file versions in the artifact store
+            store.update(artifact_store.contents(tool_msg.artifact.files))
 
         elif tool_name == "get_codebase_content":
-            files_content = get_codebase_content.invoke(tool_call["args"])
-            for filePath, file_content in files_content.items():
-                context_updates["files_contents"][filePath] = files_content
-
-            return Command(
-                goto=TOOLS_NODE,
-                update={
-                    "messages": state_messages + new_messages,
-                    "context": {**state.context, **context_updates},
-                    "return_to_agent_node": True,
-                },
-            )
+            store.update(output)
+
+            needs_follow_up = True
+
+        elif tool_name == "get_definitions":
+            symbols = ", ".join(tool_call["args"].get("symbols") or [])
+            store.add(f"definitions of {symbols}", output)
+
+            needs_follow_up = True
 
         else:
             print("unregistered tool_call!")
-            output = tool.invoke(tool_call["args"])
+
+    if needs_follow_up:
+        return Command(
+            goto=TOOLS_NODE,
+            update={
+                "messages": state_messages + new_messages,
+                "context": store.to_state(),
+                "return_to_agent_node": True,
+            },
+        )
 
     return Command(
         goto=END,
         update={
             "messages": state_messages + new_messages,
-            "context": {**state.context, **context_updates},
+            "context": store.to_state(),
             "return_to_agent_node": False,
         },
     )
@@ -171,8 +201,12 @@ def tools_node(state: GraphState) -> Dict[str, AnyMessage]:
     )
 
 
-def get_runnable():
-    """Create and configure the workflow graph"""
+def get_runnable(checkpointer=None):
+    """Create and configure the workflow graph
+
+    State is checkpointed after every node (per `thread_id` in the run's
+    config) with `checkpointer`, the process-wide SQLite one by default.
+    """
     workflow = StateGraph(GraphState)
 
     # Add nodes
@@ -194,8 +228,6 @@ def get_runnable():
     # )
 
     # Compile the workflow
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer or get_checkpointer())
     return app
 
-
-app = get_runnable()
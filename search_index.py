@@ -0,0 +1,230 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from file_cache import Signature, file_signature
+from tree_index import REFRESH_INTERVAL, get_tree_index
+
+SEARCH_EXTENSIONS = (
+    ".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs",
+    ".json", ".css", ".scss", ".md", ".mdx", ".html", ".prisma", ".sql",
+)
+# Only the start of very large files is indexed
+INDEX_MAX_BYTES = 64 * 1024
+PATH_WEIGHT = 3  # path terms count this many times
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_LINES = 12
+# Snippet lines are cut at this length and each file's excerpt at the total
+SNIPPET_LINE_CHARS = 200
+SNIPPET_MAX_CHARS = 2000
+# Files averaging longer lines are minified or generated, no snippet for them
+MINIFIED_LINE_CHARS = 300
+
+WORD = re.compile(r"[A-Za-z0-9]+")
+PART = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "import", "export",
+    "const", "return", "function", "default", "to", "of", "in", "is", "it",
+    "a", "an", "on", "be", "as", "or", "if", "add", "use",
+}
+
+
+@lru_cache(maxsize=65536)
+def _terms(word: str) -> Tuple[str, ...]:
+    parts = {word.lower(), *(p.lower() for p in PART.findall(word))}
+    return tuple(t for t in parts if len(t) > 1 and t not in STOPWORDS)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words, identifiers also split on camelCase/snake_case"""
+    return [term for word in WORD.findall(text) for term in _terms(word)]
+
+
+def term_counts(text: str) -> Counter:
+    counts: Counter = Counter()
+    for word, frequency in Counter(WORD.findall(text)).items():
+        for term in _terms(word):
+            counts[term] += frequency
+    return counts
+
+
+class SearchIndex:
+    """BM25 inverted index over the paths and contents of project files,
+    updated per file like the symbol index"""
+
+    def __init__(self, root: str, refresh_interval: float = REFRESH_INTERVAL):
+        self.root = os.path.normpath(root)
+        self.refresh_interval = refresh_interval
+        self._docs: Dict[str, Tuple[Optional[Signature], Counter, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._validated_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def _rel(self, full_path: str) -> str:
+        return os.path.relpath(full_path, self.root).replace(os.sep, "/")
+
+    def _set(self, rel: str, signature, content: str):
+        self._unset(rel)
+        terms = term_counts(content[:INDEX_MAX_BYTES])
+        for term in tokenize(rel):
+            terms[term] += PATH_WEIGHT
+        length = sum(terms.values())
+        self._docs[rel] = (signature, terms, length)
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[rel] = frequency
+
+    def _unset(self, rel: str):
+        old = self._docs.pop(rel, None)
+        if old is None:
+            return
+        self._total_length -= old[2]
+        for term in old[1]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(rel, None)
+                if not postings:
+                    del self._postings[term]
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._validated_at is not None
+                and now - self._validated_at < self.refresh_interval
+            ):
+                return
+            files = get_tree_index(self.root).files(SEARCH_EXTENSIONS)
+            current = set(files.values())
+            for rel in [r for r in self._docs if r not in current]:
+                self._unset(rel)
+            for full_path, rel in files.items():
+                try:
+                    signature = file_signature(os.stat(full_path))
+                except OSError:
+                    self._unset(rel)
+                    continue
+                known = self._docs.get(rel)
+                if known is not None and known[0] == signature:
+                    continue
+                try:
+                    with open(full_path, encoding="utf-8", errors="replace") as file:
+                        content = file.read(INDEX_MAX_BYTES)
+                except OSError:
+                    continue
+                self._set(rel, signature, content)
+            self._validated_at = now
+
+    def note_write(self, full_path: str, content: str):
+        if not full_path.endswith(SEARCH_EXTENSIONS):
+            return
+        full_path = os.path.normpath(full_path)
+        try:
+            signature = file_signature(os.stat(full_path))
+        except OSError:
+            signature = None
+        with self._lock:
+            self._set(self._rel(full_path), signature, content)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Top `k` (relative path, score) for `query`"""
+        self.refresh()
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._docs)
+            if not count or not terms:
+                return []
+            average = self._total_length / count
+            scores: Counter = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                for rel, frequency in postings.items():
+                    length = self._docs[rel][2]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+                    scores[rel] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return scores.most_common(k)
+
+    def snippets(self, query: str, k: int = 5, lines: int = SNIPPET_LINES) -> str:
+        """The best matching `lines`-line window of each of the top `k` files"""
+        terms = set(tokenize(query))
+        parts = []
+        for rel, score in self.search(query, k):
+            path = os.path.join(self.root, rel)
+            try:
+                with open(path, encoding="utf-8", errors="replace") as file:
+                    content = file.read(INDEX_MAX_BYTES).splitlines()
+            except OSError:
+                continue
+            if not content or _minified(content):
+                continue
+            hits = [len(terms.intersection(tokenize(line))) for line in content]
+            start = _best_window(hits, lines)
+            excerpt = content[start : start + lines]
+            parts.append(
+                f"--- {rel}:{start + 1}-{start + len(excerpt)} (score {score:.2f})\n"
+                + _clip(excerpt)
+            )
+        return "\n\n".join(parts)
+
+
+def _minified(lines: List[str]) -> bool:
+    return sum(map(len, lines)) / len(lines) > MINIFIED_LINE_CHARS
+
+
+def _clip(lines: List[str]) -> str:
+    """Join `lines`, each cut at SNIPPET_LINE_CHARS, the whole at SNIPPET_MAX_CHARS"""
+    clipped = [
+        line if len(line) <= SNIPPET_LINE_CHARS else line[:SNIPPET_LINE_CHARS] + " ..."
+        for line in lines
+    ]
+    text = "\n".join(clipped)
+    if len(text) > SNIPPET_MAX_CHARS:
+        text = text[:SNIPPET_MAX_CHARS] + " ..."
+    return text
+
+
+def _best_window(hits: List[int], size: int) -> int:
+    """Start of the `size`-long window with the most hits (sliding sum)"""
+    best = 0
+    window = best_sum = sum(hits[:size])
+    for start in range(1, len(hits) - size + 1):
+        window += hits[start + size - 1] - hits[start - 1]
+        if window > best_sum:
+            best, best_sum = start, window
+    return best
+
+
+_indexes: Dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(root: str) -> SearchIndex:
+    """Return the shared search index for `root`, creating it on first use"""
+    key = os.path.normpath(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SearchIndex(key)
+        return index
+
+
+def note_write(file_path: str, content: str):
+    """Re-index a written file in every search index whose root contains it"""
+    path = os.path.normpath(file_path)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if path.startswith(index.root + os.sep):
+            index.note_write(path, content)
@@ -0,0 +1,242 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from file_cache import Signature, file_signature
+from tree_index import REFRESH_INTERVAL, get_tree_index
+
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+JSX_EXTENSIONS = (".tsx", ".jsx")
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+# App Router special files, indexed as a symbol named after their route
+ROUTE_FILES = {"page", "layout", "route", "template", "loading", "error", "not-found"}
+
+# Top-level declarations only (column 0), nested helpers are not indexed
+DECLARATION = re.compile(
+    r"^(?P<export>export\s+(?:default\s+)?)?(?:declare\s+)?(?:async\s+)?"
+    r"(?:(?P<function>function\*?)\s*(?P<function_name>[A-Za-z_$][\w$]*)?\s*[(<]"
+    r"|(?:const|let|var)\s+(?P<variable_name>[A-Za-z_$][\w$]*)"
+    r"|(?:abstract\s+)?(?P<type>class|interface|type|enum)\s+"
+    r"(?P<type_name>[A-Za-z_$][\w$]*))"
+)
+# Strings, template literals and comments on one line, before counting brackets
+NOISE = re.compile(
+    r"//.*$|/\*.*?\*/|'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|`(?:\\.|[^`\\])*`"
+)
+OPENING, CLOSING = "{([", "})]"
+
+
+class Symbol(NamedTuple):
+    name: str
+    kind: str  # function, component, hook, handler, const, class, type, page, ...
+    path: str  # relative to the project root, "/" separated
+    start: int  # 1-based, inclusive
+    end: int
+    route: Optional[str] = None  # App Router route of page/layout/route files
+
+
+def app_route(rel_path: str) -> Optional[Tuple[str, str]]:
+    """(route, file kind) for App Router special files, else None"""
+    parts = rel_path.split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    if "app" not in parts[:-1] or stem not in ROUTE_FILES:
+        return None
+    segments = parts[parts.index("app") + 1 : -1]
+    # Route groups "(marketing)" and parallel route slots "@modal" are not URL segments
+    segments = [s for s in segments if not s.startswith(("(", "@"))]
+    return "/" + "/".join(segments), stem
+
+
+def _block_end(lines: List[str], start: int) -> int:
+    """0-based last line of the declaration starting at `start`"""
+    depth = 0
+    opened = False
+    for index in range(start, len(lines)):
+        code = NOISE.sub("", lines[index]).rstrip()
+        for char in code:
+            if char in OPENING:
+                depth += 1
+                opened = True
+            elif char in CLOSING:
+                depth -= 1
+        if depth <= 0 and (
+            opened or code.endswith(";") or not code.endswith(("=", "=>", ",", ":"))
+        ):
+            return index
+    return len(lines) - 1
+
+
+def _kind(name: str, match: re.Match, rel_path: str, route: Optional[str]) -> str:
+    if match.group("type"):
+        return match.group("type")
+    if route is not None and name in HTTP_METHODS:
+        return "handler"
+    if name.startswith("use") and len(name) > 3 and name[3].isupper():
+        return "hook"
+    if name[0].isupper() and rel_path.endswith(JSX_EXTENSIONS):
+        return "component"
+    return "function" if match.group("function") else "const"
+
+
+def parse_symbols(rel_path: str, content: str) -> List[Symbol]:
+    """Exported declarations, components, hooks and route handlers of a file"""
+    lines = content.splitlines()
+    special = app_route(rel_path)
+    route = special[0] if special else None
+    symbols: List[Symbol] = []
+    if special:
+        end = max(len(lines), 1)
+        symbols.append(Symbol(route, special[1], rel_path, 1, end, route))
+
+    for index, line in enumerate(lines):
+        if not line or line[0].isspace():
+            continue
+        match = DECLARATION.match(line)
+        if not match:
+            continue
+        exported = bool(match.group("export"))
+        name = (
+            match.group("function_name")
+            or match.group("variable_name")
+            or match.group("type_name")
+            or ("default" if exported else None)
+        )
+        if not name:
+            continue
+        kind = _kind(name, match, rel_path, route)
+        if not exported and kind not in ("component", "hook"):
+            continue
+        end = _block_end(lines, index)
+        handler_route = route if kind == "handler" else None
+        symbols.append(Symbol(name, kind, rel_path, index + 1, end + 1, handler_route))
+    return symbols
+
+
+class SymbolIndex:
+    """Symbols of every source file below `root`, re-parsed per file when its
+    signature changes and immediately on writes made through edit_file"""
+
+    def __init__(self, root: str, refresh_interval: float = REFRESH_INTERVAL):
+        self.root = os.path.normpath(root)
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, Tuple[Optional[Signature], List[Symbol]]] = {}
+        self._names: Dict[str, List[Symbol]] = {}
+        self._validated_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def _set(self, full_path: str, signature, symbols: List[Symbol]):
+        self._unset(full_path)
+        self._files[full_path] = (signature, symbols)
+        for symbol in symbols:
+            self._names.setdefault(symbol.name.lower(), []).append(symbol)
+
+    def _unset(self, full_path: str):
+        old = self._files.pop(full_path, None)
+        if old is None:
+            return
+        for symbol in old[1]:
+            entries = self._names.get(symbol.name.lower(), [])
+            if symbol in entries:
+                entries.remove(symbol)
+            if not entries:
+                self._names.pop(symbol.name.lower(), None)
+
+    def _rel(self, full_path: str) -> str:
+        return os.path.relpath(full_path, self.root).replace(os.sep, "/")
+
+    def refresh(self, force: bool = False):
+        """Re-parse files whose (mtime, size, inode) changed, drop removed ones"""
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._validated_at is not None
+                and now - self._validated_at < self.refresh_interval
+            ):
+                return
+            files = get_tree_index(self.root).files(SOURCE_EXTENSIONS)
+            for full_path in [p for p in self._files if p not in files]:
+                self._unset(full_path)
+            for full_path, rel in files.items():
+                try:
+                    signature = file_signature(os.stat(full_path))
+                except OSError:
+                    self._unset(full_path)
+                    continue
+                known = self._files.get(full_path)
+                if known is not None and known[0] == signature:
+                    continue
+                # Read directly, a full build would flush the shared file cache
+                try:
+                    with open(full_path, encoding="utf-8", errors="replace") as file:
+                        content = file.read()
+                except OSError:
+                    continue
+                self._set(full_path, signature, parse_symbols(rel, content))
+            self._validated_at = now
+
+    def note_write(self, full_path: str, content: str):
+        if not full_path.endswith(SOURCE_EXTENSIONS):
+            return
+        full_path = os.path.normpath(full_path)
+        try:
+            signature = file_signature(os.stat(full_path))
+        except OSError:
+            signature = None
+        with self._lock:
+            symbols = parse_symbols(self._rel(full_path), content)
+            self._set(full_path, signature, symbols)
+
+    def lookup(self, query: str, path: Optional[str] = None) -> List[Symbol]:
+        """Symbols named `query`, route paths ("/blog") and handlers
+        ("GET /api/users") too, optionally only in file `path`"""
+        self.refresh()
+        key = query.strip()
+        method, _, route = key.partition(" ")
+        with self._lock:
+            if route and method.upper() in HTTP_METHODS:
+                found = [
+                    s for s in self._names.get(method.lower(), []) if s.route == route
+                ]
+            else:
+                found = list(self._names.get(key.lower(), []))
+        if path:
+            path = path.replace(os.sep, "/").removeprefix("./")
+            found = [s for s in found if s.path == path]
+        return sorted(found, key=lambda s: (s.path, s.start))
+
+    def similar(self, query: str, limit: int = 5) -> List[str]:
+        needle = query.strip().lower()
+        with self._lock:
+            names = [
+                symbols[0].name
+                for name, symbols in self._names.items()
+                if needle in name and symbols
+            ]
+        return sorted(names, key=len)[:limit]
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: str) -> SymbolIndex:
+    """Return the shared symbol index for `root`, creating it on first use"""
+    key = os.path.normpath(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SymbolIndex(key)
+        return index
+
+
+def note_write(file_path: str, content: str):
+    """Re-parse a written file in every symbol index whose root contains it"""
+    path = os.path.normpath(file_path)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if path.startswith(index.root + os.sep):
+            index.note_write(path, content)
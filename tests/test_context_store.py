@@ -0,0 +1,33 @@
+from context_store import ContextStore, _tokens
+
+
+def test_render_shows_excerpt_of_oversized_file():
+    store = ContextStore()
+    big = "\n".join(f"line {n} " + "x" * 30 for n in range(1000))
+    store.add("src/page.tsx", big)
+    store.add("src/small.ts", "export const a = 1")
+    rendered = store.render("page", max_tokens=2000)
+    assert "--- src/page.tsx" in rendered and "(excerpt)" in rendered
+    assert "line 0 " in rendered and "line 999 " in rendered
+    assert "lines omitted" in rendered and "export const a = 1" in rendered
+    assert _tokens(rendered) <= 2000 + 50
+
+
+def test_render_lists_files_without_room_by_name():
+    store = ContextStore()
+    store.add("a.ts", "a" * 4000)
+    store.add("b.ts", "b" * 4000)
+    rendered = store.render("a", max_tokens=1100)
+    assert "b.ts" in rendered and "b" * 100 not in rendered
+    assert "get_codebase_content" not in rendered
+
+
+def test_eviction_keeps_files_relevant_to_the_query():
+    store = ContextStore(max_tokens=2500)
+    store.next_turn(query="fix the checkout button")
+    store.add("src/footer.tsx", "f" * 4000)
+    store.add("src/header.tsx", "h" * 4000)
+    # Without the query the last added file is the first to go
+    store.add("src/checkout.tsx", "c" * 4000)
+    assert "src/checkout.tsx" in store.files
+    assert ContextStore(store.to_state()).query == "fix the checkout button"
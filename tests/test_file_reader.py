@@ -0,0 +1,30 @@
+import pytest
+
+import file_reader
+from file_reader import read_byte_range, read_line_range, read_pending
+
+
+def test_line_range_shows_start_of_line_over_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_reader, "READ_MAX_BYTES", 10)
+    path = tmp_path / "data.json"
+    path.write_text("{\n" + "x" * 50 + "\n}\n")
+    result = read_line_range(str(path), 2, 3)
+    assert result.startswith("[Line 2 of 3") and "byteOffset=12" in result
+    assert result.endswith("\n" + "x" * 10)
+
+
+def test_line_range_cuts_at_limit_after_whole_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_reader, "READ_MAX_BYTES", 10)
+    path = tmp_path / "a.txt"
+    path.write_text("one\ntwo\nthree\n")
+    assert read_line_range(str(path), 1).startswith("[Lines 1-2 of 3, cut at")
+
+
+def test_byte_length_must_be_positive(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("abc")
+    with pytest.raises(ValueError):
+        read_byte_range(str(path), 0, 0)
+    with pytest.raises(ValueError):
+        read_pending("abc", length=-1)
+    assert read_byte_range(str(path), 1, 1).endswith("\nb")
@@ -0,0 +1,45 @@
+import os
+
+from overlay import JOURNAL_DIR, WriteOverlay, _lock, _unlock, recover
+
+
+def _interrupted_commit(root, name):
+    """A journal as a crash between renames leaves it: file renamed, backup kept"""
+    target = root / "a.txt"
+    journal_dir = root / JOURNAL_DIR / name
+    journal_dir.mkdir(parents=True)
+    (journal_dir / "0").write_text("old")
+    target.write_text("new")
+    entries = f'[{{"path": "{target}", "backup": "{journal_dir / "0"}"}}]'
+    (journal_dir / "journal.json").write_text(entries)
+    return target
+
+
+def test_commit_writes_files_and_removes_journal(tmp_path):
+    overlay = WriteOverlay(str(tmp_path))
+    overlay.write(str(tmp_path / "src" / "a.ts"), "export {}")
+    overlay.commit()
+    assert (tmp_path / "src" / "a.ts").read_text() == "export {}"
+    assert os.listdir(tmp_path / JOURNAL_DIR) == []
+
+
+def test_recover_rolls_back_journal_of_dead_commit(tmp_path):
+    target = _interrupted_commit(tmp_path, "abc123")
+    (tmp_path / JOURNAL_DIR / "abc123.lock").write_bytes(b"")
+    recover(str(tmp_path))
+    assert target.read_text() == "old"
+    assert os.listdir(tmp_path / JOURNAL_DIR) == []
+
+
+def test_recover_skips_journal_whose_lock_is_held(tmp_path):
+    target = _interrupted_commit(tmp_path, "abc123")
+    lock_path = tmp_path / JOURNAL_DIR / "abc123.lock"
+    lock = open(lock_path, "wb")
+    assert _lock(lock)
+    try:
+        recover(str(tmp_path))
+        assert target.read_text() == "new"
+    finally:
+        _unlock(lock, str(lock_path))
+    recover(str(tmp_path))
+    assert target.read_text() == "old"
@@ -0,0 +1,105 @@
+import pytest
+
+from patching import (
+    PatchError,
+    apply_line_range,
+    apply_search_replace,
+    apply_unified_diff,
+    parse_unified_diff,
+)
+
+ORIGINAL = "one\ntwo\nthree\nfour\nfive\n"
+
+
+def test_unified_diff_applies_at_stated_line():
+    diff = "--- a/f\n+++ b/f\n@@ -2,3 +2,3 @@\n two\n-three\n+THREE\n four\n"
+    assert apply_unified_diff(ORIGINAL, diff) == "one\ntwo\nTHREE\nfour\nfive\n"
+
+
+def test_unified_diff_finds_moved_hunk():
+    diff = "@@ -40,3 +40,3 @@\n two\n-three\n+THREE\n four\n"
+    assert apply_unified_diff(ORIGINAL, diff) == "one\ntwo\nTHREE\nfour\nfive\n"
+
+
+def test_unified_diff_tolerates_whitespace_and_keeps_file_context():
+    original = "def f():\n    a = 1\n    return a\n"
+    diff = "@@ -1,3 +1,3 @@\n def f():\n-  a = 1\n+    a = 2\n   return a\n"
+    assert apply_unified_diff(original, diff) == "def f():\n    a = 2\n    return a\n"
+
+
+def test_unified_diff_fuzz_drops_stale_outer_context():
+    diff = "@@ -1,5 +1,5 @@\n stale\n two\n-three\n+THREE\n four\n"
+    assert apply_unified_diff(ORIGINAL, diff) == "one\ntwo\nTHREE\nfour\nfive\n"
+
+
+def test_unified_diff_rejects_hunk_without_matching_context():
+    diff = "@@ -2,2 +2,3 @@\n totally\n+INSERTED\n unrelated"
+    with pytest.raises(PatchError):
+        apply_unified_diff("p\nq\nr\ns\n", diff)
+
+
+def test_unified_diff_removes_lines_that_look_like_headers():
+    original = "SELECT 1;\n-- comment\nSELECT 2;\n"
+    diff = "--- a/q.sql\n+++ b/q.sql\n@@ -1,3 +1,2 @@\n SELECT 1;\n--- comment\n SELECT 2;\n"
+    assert apply_unified_diff(original, diff) == "SELECT 1;\nSELECT 2;\n"
+
+
+def test_unified_diff_ignores_lines_after_counted_hunk():
+    hunks = parse_unified_diff("@@ -1 +1 @@\n-one\n+ONE\ndiff --git a/g b/g\n")
+    assert hunks[0].old == ["one"] and hunks[0].new == ["ONE"]
+
+
+def test_unified_diff_inserts_after_stated_line():
+    original = "a\nb\nc\nd\ne\n"
+    diff = "@@ -2,0 +3 @@\n+NEW\n"
+    assert apply_unified_diff(original, diff) == "a\nb\nNEW\nc\nd\ne\n"
+    assert apply_unified_diff(original, "@@ -0,0 +1 @@\n+TOP\n").startswith("TOP\na\n")
+
+
+def test_unified_diff_appends_at_end_of_file():
+    diff = "@@ -3,0 +4 @@\n+END\n"
+    assert apply_unified_diff("a\nb\nc\n", diff) == "a\nb\nc\nEND\n"
+
+
+def test_unified_diff_without_hunks_fails():
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, "just some text")
+
+
+def test_unified_diff_keeps_crlf():
+    diff = "@@ -1,2 +1,2 @@\n a\n-b\n+B\n"
+    assert apply_unified_diff("a\r\nb\r\n", diff) == "a\r\nB\r\n"
+
+
+def test_search_replace_exact_and_loose():
+    edits = [
+        {"search": "two\n", "replace": "TWO\n"},
+        {"search": "  three\nfour", "replace": "3\n4"},
+    ]
+    assert apply_search_replace(ORIGINAL, edits) == "one\nTWO\n3\n4\nfive\n"
+
+
+def test_search_replace_loose_match_beyond_search_window():
+    lines = [f"line {n}" for n in range(3000)] + ["    target  = 1"]
+    edits = [{"search": "target = 1", "replace": "target = 2"}]
+    assert apply_search_replace("\n".join(lines), edits).endswith("target = 2")
+
+
+def test_search_replace_requires_unique_match():
+    with pytest.raises(PatchError):
+        apply_search_replace("x\nx\n", [{"search": "x", "replace": "y"}])
+    with pytest.raises(PatchError):
+        apply_search_replace(ORIGINAL, [{"search": "missing", "replace": "y"}])
+
+
+def test_line_range_replace_insert_and_append():
+    assert apply_line_range(ORIGINAL, 2, 3, "X") == "one\nX\nfour\nfive\n"
+    assert apply_line_range(ORIGINAL, 2, 1, "X") == "one\nX\ntwo\nthree\nfour\nfive\n"
+    assert apply_line_range(ORIGINAL, 6, 5, "six") == ORIGINAL + "six\n"
+
+
+def test_line_range_rejects_invalid_range():
+    with pytest.raises(PatchError):
+        apply_line_range(ORIGINAL, 0, 2, "X")
+    with pytest.raises(PatchError):
+        apply_line_range(ORIGINAL, 9, 9, "X")
@@ -0,0 +1,12 @@
+from search_index import SNIPPET_MAX_CHARS, SearchIndex
+
+
+def test_snippets_cut_long_lines_and_skip_minified_files(tmp_path):
+    lines = [f"  const item{n} = cart.items[{n}]" for n in range(40)]
+    lines[5] = "  const label = '" + "cart " * 300 + "'"
+    (tmp_path / "cart.ts").write_text("\n".join(lines))
+    (tmp_path / "bundle.min.js").write_text("function cart(){" + "x" * 20000 + "}")
+    snippets = SearchIndex(str(tmp_path)).snippets("cart")
+    assert "--- cart.ts" in snippets and "bundle.min.js" not in snippets
+    assert len(snippets) < SNIPPET_MAX_CHARS
+    assert " ..." in snippets
@@ -0,0 +1,11 @@
+from tree_index import TreeIndex
+
+
+def test_focus_dirs_ignores_siblings_sharing_the_root_prefix(tmp_path):
+    (tmp_path / "proj" / "src").mkdir(parents=True)
+    (tmp_path / "project2" / "src").mkdir(parents=True)
+    index = TreeIndex(str(tmp_path / "proj"))
+    index.note_write(str(tmp_path / "project2" / "src" / "a.ts"))
+    index.note_write(str(tmp_path / "proj" / "src" / "b.ts"))
+    focus = index.focus_dirs(None)
+    assert focus == {str(tmp_path / "proj"), str(tmp_path / "proj" / "src")}
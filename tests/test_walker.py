@@ -0,0 +1,13 @@
+import os
+
+from walker import walk
+
+
+def test_walk_does_not_follow_symlinked_folders(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.ts").write_text("export {}")
+    os.symlink(tmp_path, tmp_path / "src" / "loop")
+    for workers in (1, 4):
+        scans = walk(str(tmp_path), workers=workers)
+        assert set(scans) == {str(tmp_path), str(tmp_path / "src")}
+        assert ("loop", False) in scans[str(tmp_path / "src")].entries
@@ -0,0 +1,99 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.tools import BaseTool
+
+from events import emit
+from tracing import count, span
+
+MAX_TOOL_WORKERS = int(os.getenv("MAX_TOOL_WORKERS", "8"))
+
+# Tools that touch arbitrary files, they run after everything requested
+# before them and everything requested after them waits for them.
+EXCLUSIVE_TOOLS = {"builder_tool"}
+
+_pool = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+_worker = threading.local()
+
+
+def tool_call_paths(tool_call: Dict[str, Any]) -> List[str]:
+    """Project paths a tool call reads or writes"""
+    args = tool_call.get("args") or {}
+    paths = []
+    if isinstance(args.get("filePath"), str):
+        paths.append(args["filePath"])
+    if isinstance(args.get("filesPaths"), list):
+        paths.extend(p for p in args["filesPaths"] if isinstance(p, str))
+    return [os.path.normpath(p) for p in paths]
+
+
+def run_tool_calls(
+    tool_calls: List[Dict[str, Any]], tools: Dict[str, BaseTool]
+) -> List[Any]:
+    """Invoke `tool_calls` concurrently and return their outputs in request order
+
+    Calls sharing a path run in the order they were requested, so a write is
+    never overtaken by a later read or write of the same file.
+    """
+    resolved = []
+    for tool_call in tool_calls:
+        tool = tools.get(tool_call["name"])
+        if tool is None:
+            raise Exception(f"Tool '{tool_call['name']}' not found.")
+        resolved.append((tool, tool_call))
+
+    # Tool calls made from inside a pooled tool (e.g. builder_tool) run inline,
+    # a worker blocking on the same pool could otherwise starve it.
+    if len(resolved) <= 1 or getattr(_worker, "active", False):
+        return [_invoke(tool, tool_call["args"]) for tool, tool_call in resolved]
+
+    futures: List[Future] = []
+    last_by_path: Dict[str, Future] = {}
+    last_exclusive = None
+
+    for tool, tool_call in resolved:
+        if tool_call["name"] in EXCLUSIVE_TOOLS:
+            deps = list(futures)
+        else:
+            paths = tool_call_paths(tool_call)
+            deps = [last_by_path[p] for p in paths if p in last_by_path]
+            if last_exclusive is not None:
+                deps.append(last_exclusive)
+
+        # Each call keeps the caller's context (run config, tracing, streaming)
+        context = contextvars.copy_context()
+        args = tool_call["args"]
+        future = _pool.submit(context.run, _invoke_after, deps, tool, args)
+        futures.append(future)
+
+        if tool_call["name"] in EXCLUSIVE_TOOLS:
+            last_exclusive = future
+        for path in tool_call_paths(tool_call):
+            last_by_path[path] = future
+
+    return [future.result() for future in futures]
+
+
+def _invoke_after(deps: List[Future], tool: BaseTool, args: Dict[str, Any]):
+    # Dependencies were submitted first, so they are already running or done
+    for dep in deps:
+        dep.exception()
+    _worker.active = True
+    try:
+        return _invoke(tool, args)
+    finally:
+        _worker.active = False
+
+
+def _invoke(tool: BaseTool, args: Dict[str, Any]):
+    paths = tool_call_paths({"args": args})
+    emit("tool_start", name=tool.name, paths=paths)
+    try:
+        with span(tool.name, paths=paths):
+            count("tool_calls")
+            return tool.invoke(args)
+    finally:
+        emit("tool_end", name=tool.name, paths=paths)
@@ -1,25 +1,83 @@
 from pydantic import BaseModel, Field
-from config import client
-from langchain.tools import tool, Tool
+from config import WORKSPACE_ROOT
+from langchain_core.tools import tool
 from langchain_core.messages import ToolMessage, HumanMessage, AIMessage, BaseMessage
 from utils import get_tree, make_llm_call
+from artifacts import BuildArtifact, artifact_store
+from deltas import DeltaTracker
+from events import emit
+from tracing import add, annotate
+from tool_executor import run_tool_calls
+from file_cache import file_cache
+from patching import (
+    PatchError,
+    apply_line_range,
+    apply_search_replace,
+    apply_unified_diff,
+)
+import file_reader
+import import_graph
+import overlay
+import search_index
+import symbol_index
+import tree_index
 import os
 import json
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 import re
 
 
+class SearchReplaceBlock(BaseModel):
+    search: str = Field(description="Exact existing text to find (must be unique).")
+    replace: str = Field(description="Text to put in its place.")
+
+
 class EditFileSchema(BaseModel):
     filePath: str = Field(
         description="The relative path of the file to edit. Root folder is user_project."
     )
-    fileContent: str = Field(description="The complete content to write to the file.")
+    fileContent: Optional[str] = Field(
+        default=None,
+        description=(
+            "The complete content to write to the file, or with startLine/endLine "
+            "the text that replaces just those lines."
+        ),
+    )
+    patch: Optional[str] = Field(
+        default=None,
+        description="A unified diff (@@ hunks with a few context lines) to apply to the file.",
+    )
+    edits: Optional[List[SearchReplaceBlock]] = Field(
+        default=None,
+        description="Search/replace blocks applied in order, each search must match once.",
+    )
+    startLine: Optional[int] = Field(
+        default=None,
+        description="First line (1-based) replaced by fileContent, for line-range edits.",
+    )
+    endLine: Optional[int] = Field(
+        default=None,
+        description="Last line (inclusive) replaced by fileContent, startLine - 1 inserts.",
+    )
 
 
 class ReadFileSchema(BaseModel):
     filePath: str = Field(
         description="The relative path of the file to read. Root folder is user_project."
     )
+    startLine: Optional[int] = Field(
+        default=None,
+        description="First line to read (1-based). Use with endLine to read only part of a large file.",
+    )
+    endLine: Optional[int] = Field(
+        default=None, description="Last line to read (inclusive)."
+    )
+    byteOffset: Optional[int] = Field(
+        default=None, description="Byte offset to start reading from."
+    )
+    byteLength: Optional[int] = Field(
+        default=None, description="Number of bytes to read from byteOffset."
+    )
 
 
 class BuilderSchema(BaseModel):
@@ -29,12 +87,32 @@ class BuilderSchema(BaseModel):
     state_messages: List[BaseMessage]
 
 
+class FinishBuildSchema(BaseModel):
+    summary: str = Field(description="What was changed, file by file.")
+    status: Literal["complete", "blocked"] = Field(
+        default="complete",
+        description="'blocked' if the task could not be finished, say why in the summary.",
+    )
+
+
 class GetCodebaseContentSchema(BaseModel):
     filesPaths: List[str] = Field(
         description="List of file paths to retrieve content from. Example: ['src/package.json', 'src/app/page.tsx']"
     )
 
 
+class GetDefinitionsSchema(BaseModel):
+    symbols: List[str] = Field(
+        description=(
+            "Names of exported functions, components, hooks or types, App Router "
+            "routes like '/dashboard', or route handlers like 'GET /api/users'."
+        )
+    )
+    filePath: Optional[str] = Field(
+        default=None, description="Only look for the symbols in this file."
+    )
+
+
 class AnalyzeCodeSchema(BaseModel):
     filePath: str = Field(description="The relative path of the file to analyze.")
     analysisType: Optional[str] = Field(
@@ -43,22 +121,54 @@ class AnalyzeCodeSchema(BaseModel):
     )
 
 
+def record_write(full_path: str, content: str):
+    """Keep the shared caches and indexes in step with a file written to disk"""
+    file_cache.put(full_path, content)
+    tree_index.note_write(full_path)
+    symbol_index.note_write(full_path, content)
+    search_index.note_write(full_path, content)
+    import_graph.note_write(full_path)
+
+
 @tool(
     args_schema=ReadFileSchema,
-    description="Reads the content of a specified file from the user_project directory.",
+    description=(
+        "Reads the content of a specified file from the user_project directory. "
+        "Large files return a head/tail preview with line counts, read the rest "
+        "with startLine/endLine or byteOffset/byteLength."
+    ),
 )
-def read_file(filePath: str) -> str:
-    """Read a file from the project directory."""
+def read_file(
+    filePath: str,
+    startLine: Optional[int] = None,
+    endLine: Optional[int] = None,
+    byteOffset: Optional[int] = None,
+    byteLength: Optional[int] = None,
+) -> str:
+    """Read a file, or a line/byte range of it, from the project directory."""
     print(f"Reading file: {filePath}")
-    full_path = os.path.join(os.getcwd(), "user_project", filePath)
+    full_path = os.path.join(WORKSPACE_ROOT, filePath)
 
-    if not os.path.isfile(full_path):
+    pending = overlay.pending_content(full_path)
+    if pending is None and not os.path.isfile(full_path):
         print(f"File {filePath} doesn't exist")
         return f"File '{filePath}' does not exist."
 
     try:
-        with open(full_path, "r", encoding="utf-8") as file:
-            fileContent = file.read()
+        if pending is not None:
+            # Edited earlier in this builder run, not committed yet
+            fileContent = file_reader.read_pending(
+                pending, startLine, endLine, byteOffset, byteLength
+            )
+        elif byteOffset is not None or byteLength is not None:
+            fileContent = file_reader.read_byte_range(
+                full_path, byteOffset or 0, byteLength
+            )
+        elif startLine is not None or endLine is not None:
+            fileContent = file_reader.read_line_range(full_path, startLine or 1, endLine)
+        else:
+            fileContent = file_reader.read_text(full_path)
+        add("bytes_read", len(fileContent.encode("utf-8", "replace")))
         print(f"Successfully read file: {filePath}")
         return fileContent
     except Exception as e:
@@ -66,32 +176,113 @@ def read_file(filePath: str) -> str:
         return f"Error reading file: {str(e)}"
 
 
+def apply_edit(
+    full_path: str,
+    fileContent: Optional[str],
+    patch: Optional[str],
+    edits: Optional[List[Any]],
+    startLine: Optional[int],
+    endLine: Optional[int],
+) -> tuple[str, str]:
+    """New content of the file and the edit mode used, raises PatchError"""
+    if endLine is not None and startLine is None:
+        raise PatchError("endLine needs a startLine, nothing was changed.")
+    if not (patch or edits or startLine is not None):
+        if fileContent is None:
+            raise PatchError(
+                "Provide fileContent, patch, edits or startLine/endLine with fileContent."
+            )
+        return fileContent, "full"
+
+    original = overlay.pending_content(full_path)
+    if original is None:
+        if not os.path.isfile(full_path):
+            raise PatchError(
+                "File does not exist, create it with the full fileContent."
+            )
+        original = file_cache.read(full_path)
+    if patch:
+        return apply_unified_diff(original, patch), "patch"
+    if edits:
+        return apply_search_replace(original, edits), "search_replace"
+    if fileContent is None:
+        raise PatchError("startLine/endLine edits need the replacement in fileContent.")
+    return apply_line_range(original, startLine, endLine, fileContent), "line_range"
+
+
 @tool(
     args_schema=EditFileSchema,
-    description="Writes content to a specified file path, creating directories if needed. Root folder is user_project.",
+    description=(
+        "Writes content to a specified file path, creating directories if needed. "
+        "Root folder is user_project. For changes to existing files prefer a small "
+        "unified diff (patch), search/replace edits or a startLine/endLine range "
+        "over resending the whole file. Nothing is written unless every hunk applies."
+    ),
 )
-def edit_file(filePath: str, fileContent: str) -> str:
+def edit_file(
+    filePath: str,
+    fileContent: Optional[str] = None,
+    patch: Optional[str] = None,
+    edits: Optional[List[SearchReplaceBlock]] = None,
+    startLine: Optional[int] = None,
+    endLine: Optional[int] = None,
+) -> str:
     """Edit or create a file in the project directory."""
     print(f"Editing file: {filePath}")
 
     # Get full file path
-    full_path = os.path.join(os.getcwd(), "user_project", filePath)
+    full_path = os.path.join(WORKSPACE_ROOT, filePath)
 
     try:
-        # Ensure the parent directory exists
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        fileContent, mode = apply_edit(
+            full_path, fileContent, patch, edits, startLine, endLine
+        )
+        annotate(edit_mode=mode)
+
+        # Inside a builder run the write waits in its overlay until commit
+        if not overlay.stage_write(full_path, fileContent):
+            # Ensure the parent directory exists
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
 
-        # Open and write to the file
-        with open(full_path, "w", encoding="utf-8") as file:
-            file.write(fileContent)
+            # Open and write to the file
+            with open(full_path, "w", encoding="utf-8") as file:
+                file.write(fileContent)
+            record_write(full_path, fileContent)
+        add("bytes_written", len(fileContent.encode("utf-8")))
 
-        print(f"Successfully edited file: {filePath}")
+        emit("file_edit", path=filePath, size=len(fileContent))
+        print(f"Successfully edited file: {filePath} ({mode})")
         return fileContent
+    except PatchError as e:
+        print(f"Edit of {filePath} did not apply: {str(e)}")
+        return f"Error applying edit, the file was not changed: {str(e)}"
     except Exception as e:
         print(f"Error editing file {filePath}: {str(e)}")
         return f"Error editing file: {str(e)}"
 
 
+FINISH_TOOL = "finish_build"
+# Builder status updates: at least BUILDER_MIN_STEPS plus one per planned
+# file, at most BUILDER_MAX_STEPS
+BUILDER_MIN_STEPS = int(os.getenv("BUILDER_MIN_STEPS", "2"))
+BUILDER_MAX_STEPS = int(os.getenv("BUILDER_MAX_STEPS", "10"))
+# Consecutive replies without a tool call before the builder gives up
+BUILDER_MAX_STALLS = int(os.getenv("BUILDER_MAX_STALLS", "2"))
+
+
+@tool(
+    FINISH_TOOL,
+    args_schema=FinishBuildSchema,
+    description=(
+        "Signal that every planned step of the coding task is done (or cannot be "
+        "done) and end the build with a summary."
+    ),
+)
+def finish_build(summary: str, status: str = "complete") -> str:
+    """Handled by the builder loop, which stops when this is called."""
+    return summary
+
+
 @tool(
     args_schema=BuilderSchema,
     description="Specialized coding agent that can implement features and modify code across multiple files.",
@@ -102,6 +293,35 @@ def builder_tool(
     """Implements code changes across multiple files to fulfill requirements."""
     print(f"Builder tool invoked with query: {detailedQuery[:60]}...")
 
+    # Edits of the run are staged and written together when it completes,
+    # a run that raises leaves the project untouched
+    with overlay.transaction(WORKSPACE_ROOT, on_write=record_write) as batch:
+        result = run_builder(detailedQuery, state_messages)
+        annotate(files_committed=len(batch.paths()))
+    return result
+
+
+def builder_tree(query: str) -> str:
+    """The project tree plus files the current run staged but has not
+    written yet, the tree index only sees them after commit"""
+    tree = get_tree(query=query)
+    batch = overlay.active_overlay()
+    staged = [
+        os.path.relpath(path, WORKSPACE_ROOT).replace(os.sep, "/")
+        for path in (batch.paths() if batch else [])
+        if not os.path.exists(path)
+    ]
+    if staged:
+        tree += "\nNew in this build (not written yet):\n" + "\n".join(
+            f"  {path}" for path in sorted(staged)
+        )
+    return tree
+
+
+def run_builder(
+    detailedQuery: str, state_messages: List[BaseMessage]
+) -> tuple[ToolMessage, AIMessage]:
+    tree = builder_tree(detailedQuery)
     prompt = f"""
         User Query: {detailedQuery}
         
@@ -109,50 +329,67 @@ def builder_tool(
             1. Analyze the user requirements and create a detailed execution plan.
             2. For each file that needs modification:
                a. Use `read_file` to check the current content
-               b. Use `edit_file` to update the file with your changes
+               b. Use `edit_file` to update the file with your changes, sending a
+                  unified diff or search/replace edits for existing files and the
+                  full content only for new files
             3. Execute ALL necessary steps - don't stop after the first tool call.
             4. Break complex changes into smaller, verifiable steps.
             5. After making changes, verify that they work as expected.
             6. When including existing code, maintain the original structure and style.
+            7. Call `finish_build` with a short summary as soon as every step is done,
+               together with your last edits if possible.
 
         Current project structure:
         TechStack: Next.js 15 with app router, backend in API routes, DaisyUI for UI framework
         
         user_project/
-        {get_tree("C:/zeropointlab/user_project")}
+        {tree}
     """
 
-    print("state_messages_length", len(state_messages))
-    agent = client.bind_tools(tools=[edit_file, read_file])
-    response = agent.invoke(input=[*state_messages, HumanMessage(content=prompt)])
-    response
+    annotate(state_messages=len(state_messages))
+    builder_tools = [edit_file, read_file, finish_build]
+    response = make_llm_call(
+        input=[*state_messages, HumanMessage(content=prompt)],
+        tools=builder_tools,
+    )
     messages = []
     files_content = {}
+    edited: List[str] = []
+
+    # The status prompts stay in `messages`, so each one only carries what
+    # changed since the previous one and refers back to earlier content.
+    deltas = DeltaTracker()
+    deltas.tree(tree)
 
     messages.append(HumanMessage(content=prompt))
     if response.content:
         messages.append(AIMessage(content=response.content))
 
-    # Process initial tool calls
-    if hasattr(response, "tool_calls") and response.tool_calls:
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool = available_tools.get(tool_name)
-
-            if tool is None:
-                raise Exception(f"Tool '{tool_name}' not found.")
-
-            tool_output = tool.invoke(tool_call["args"])
-
-            if tool_name in ["read_file", "edit_file"]:
-                files_content[tool_call["args"]["filePath"]] = tool_output
-
-    # Continue until all steps are completed
-    attempt_count = 0
-    max_attempts = 10  # Prevent infinite loops
-
-    while attempt_count < max_attempts:
-        attempt_count += 1
+    def run_calls(tool_calls: List[Dict[str, Any]]) -> Tuple[Optional[dict], int]:
+        """Run the file tools of a reply, return finish_build's arguments (if
+        it was called) and how many files were touched for the first time"""
+        finish = next((c["args"] for c in tool_calls if c["name"] == FINISH_TOOL), None)
+        tool_calls = [c for c in tool_calls if c["name"] != FINISH_TOOL]
+        new_files = 0
+        tool_outputs = run_tool_calls(tool_calls, available_tools)
+        for tool_call, tool_output in zip(tool_calls, tool_outputs):
+            if tool_call["name"] in ["read_file", "edit_file"]:
+                path = tool_call["args"]["filePath"]
+                new_files += path not in files_content
+                files_content[path] = tool_output
+            if tool_call["name"] == "edit_file":
+                edited.append(tool_call["args"]["filePath"])
+        return finish, new_files
+
+    finish, planned = run_calls(response.tool_calls or [])
+
+    # The budget starts from the plan's size (files the first reply looked at)
+    # and grows while replies reach files not seen yet; replies that neither
+    # call a tool nor finish count as stalls.
+    budget = min(BUILDER_MIN_STEPS + planned, BUILDER_MAX_STEPS)
+    step = stalls = 0
+    while finish is None and step < budget:
+        step += 1
 
         follow_up_prompt = f"""
             Current status update:
@@ -162,56 +399,64 @@ def builder_tool(
             
             Current project structure:
             user_project/
-            {get_tree("C:/zeropointlab/user_project")}
+            {deltas.tree(builder_tree(detailedQuery))}
 
-            Have all planned steps been completed ? If yes, simply reply yes and summarize what was done.
-            If no, reply with 'No' and continue implementation by using edit_file, read_file tools if requires.
+            If all planned steps are complete, call {FINISH_TOOL} with a summary of
+            what was done, it can go in the same reply as your last edits.
+            Otherwise continue the implementation with the edit_file and read_file tools.
+            {"You replied without calling a tool, call one now." if stalls else ""}
 
-            Performed changes:
-            {files_content if files_content else 'Nothing'}
+            Performed changes (files are tagged with a content hash, unchanged
+            files and diffs refer to versions shown in earlier updates):
+            {deltas.files(files_content) if files_content else 'Nothing'}
         """
-        agent = client.bind_tools(tools=[edit_file, read_file])
-        follow_up_response = agent.invoke(
-            input=[*messages, HumanMessage(content=follow_up_prompt)]
-        )
+        messages.append(HumanMessage(content=follow_up_prompt))
+        follow_up_response = make_llm_call(input=messages, tools=builder_tools)
 
         content = follow_up_response.content
         if isinstance(content, list):
             content = content[0]
-
-        messages.append(AIMessage(content=content))
-
-        # Check if we're done
-        if "yes" in content.lower():
-            print(f"Implementation completed after {attempt_count} iterations")
-            break
-
-        if "no" in content.lower() and not response.tool_calls:
-            print(f"Unextpected response occured.")
-            break
-
-        # Process additional tool calls
-        if follow_up_response.tool_calls:
-            for tool_call in follow_up_response.tool_calls:
-                tool_name = tool_call["name"]
-                tool = available_tools.get(tool_name)
-
-                if tool is None:
-                    raise Exception(f"Tool '{tool_name}' not found.")
-
-                tool_output = tool.invoke(tool_call["args"])
-
-                if tool_name in ["read_file", "edit_file"]:
-                    files_content[tool_call["args"]["filePath"]] = tool_output
-
-        # If no more tool calls and not done, we might be stuck
-        if not follow_up_response.tool_calls and attempt_count > max_attempts:
-            print("No more tool calls but implementation not confirmed complete")
-            break
+        tool_calls = follow_up_response.tool_calls or []
+        if not content and tool_calls:
+            content = "Called " + ", ".join(
+                f"{c['name']}({c['args'].get('filePath', '')})" for c in tool_calls
+            )
+        messages.append(AIMessage(content=content or "(no reply)"))
+
+        if not tool_calls:
+            stalls += 1
+            if stalls >= BUILDER_MAX_STALLS:
+                print(f"Builder stopped after {stalls} replies without tool calls")
+                break
+            continue
+        stalls = 0
+        finish, new_files = run_calls(tool_calls)
+        budget = min(max(budget, step + 1 + new_files), BUILDER_MAX_STEPS)
+
+    annotate(builder_steps=step, finished=finish is not None)
+    if finish is not None:
+        print(f"Implementation completed after {step} status updates")
+        summary = finish.get("summary") or "Done."
+        if finish.get("status") == "blocked":
+            summary = f"Could not complete the task: {summary}"
+        messages.append(AIMessage(content=summary))
+    elif not any(isinstance(msg, AIMessage) for msg in messages):
+        messages.append(
+            AIMessage(content="Stopped before the build was confirmed complete.")
+        )
     last_ai_message = [msg for msg in messages if isinstance(msg, AIMessage)][-1]
+    # File bodies go to the shared store, the message carries references
+    artifact = BuildArtifact(
+        files=[
+            artifact_store.version(path, content)
+            for path, content in files_content.items()
+        ],
+        edited=list(dict.fromkeys(edited)),
+    )
     return (
         ToolMessage(
-            content=str(files_content),
+            content=artifact.summary(),
+            artifact=artifact,
             tool_call_id="builder-summary",
             name="build_summary",
         ),
@@ -219,9 +464,48 @@ def builder_tool(
     )
 
 
+# Imports of requested files that get_codebase_content adds unasked
+PREFETCH_MAX_FILES = int(os.getenv("PREFETCH_MAX_FILES", "8"))
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", str(64 * 1024)))
+
+
+def prefetch_dependencies(
+    filesPaths: List[str], files_content: Dict[str, str]
+) -> Dict[str, str]:
+    """Content of the project files imported by `filesPaths` (first degree),
+    read through the file cache, within the prefetch limits"""
+    graph = import_graph.get_import_graph(WORKSPACE_ROOT)
+    prefetched: Dict[str, str] = {}
+    budget = PREFETCH_MAX_BYTES
+    for filepath in filesPaths:
+        try:
+            dependencies = graph.dependencies(os.path.join(WORKSPACE_ROOT, filepath))
+        except OSError:
+            continue
+        for dependency in dependencies:
+            relative = os.path.relpath(dependency, WORKSPACE_ROOT).replace(os.sep, "/")
+            if relative in files_content or relative in prefetched:
+                continue
+            if len(prefetched) >= PREFETCH_MAX_FILES:
+                return prefetched
+            try:
+                content = file_reader.read_text(dependency)
+            except (OSError, UnicodeDecodeError):
+                continue
+            if len(content) > budget:
+                continue
+            budget -= len(content)
+            add("bytes_read", len(content.encode("utf-8", "replace")))
+            prefetched[relative] = f"[Prefetched, imported by {filepath}]\n{content}"
+    return prefetched
+
+
 @tool(
     args_schema=GetCodebaseContentSchema,
-    description="Retrieves content from multiple files in the codebase.",
+    description=(
+        "Retrieves content from multiple files in the codebase. Project files they "
+        "import are included as well, so they don't need to be requested separately."
+    ),
 )
 def get_codebase_content(filesPaths: List[str]) -> Dict[str, str]:
     """Get content from multiple files in the codebase."""
@@ -235,9 +519,60 @@ def get_codebase_content(filesPaths: List[str]) -> Dict[str, str]:
         except Exception as e:
             files_content[filepath] = f"Error reading file: {str(e)}"
 
+    # The next round-trip usually asks for these, offer them now
+    prefetched = prefetch_dependencies(filesPaths, files_content)
+    annotate(prefetched=len(prefetched))
+    files_content.update(prefetched)
+
     return files_content
 
 
+MAX_DEFINITION_LINES = 200
+
+
+@tool(
+    args_schema=GetDefinitionsSchema,
+    description=(
+        "Returns only the source of the requested definitions (with file path and "
+        "line span) instead of whole files. Cheaper than get_codebase_content when "
+        "you know which components, functions, hooks or routes you need."
+    ),
+)
+def get_definitions(symbols: List[str], filePath: Optional[str] = None) -> str:
+    """Look up definitions in the project's symbol index."""
+    print(f"Getting definitions for {symbols}")
+    index = symbol_index.get_symbol_index(WORKSPACE_ROOT)
+    parts = []
+    for query in symbols:
+        found = index.lookup(query, filePath)
+        if not found:
+            similar = index.similar(query)
+            hint = f" Similar names: {', '.join(similar)}." if similar else ""
+            parts.append(f"No definition found for '{query}'.{hint}")
+            continue
+        for symbol in found:
+            full_path = os.path.join(WORKSPACE_ROOT, symbol.path)
+            try:
+                content = overlay.pending_content(full_path)
+                if content is None:
+                    content = file_cache.read(full_path)
+            except OSError as e:
+                parts.append(f"Error reading {symbol.path}: {str(e)}")
+                continue
+            lines = content.splitlines()[symbol.start - 1 : symbol.end]
+            end = symbol.end
+            if len(lines) > MAX_DEFINITION_LINES:
+                lines = lines[:MAX_DEFINITION_LINES]
+                end = symbol.start + MAX_DEFINITION_LINES - 1
+                lines.append(f"... [cut, definition ends at line {symbol.end}]")
+            add("bytes_read", sum(len(line) + 1 for line in lines))
+            parts.append(
+                f"--- {symbol.path}:{symbol.start}-{end} ({symbol.kind} {symbol.name})\n"
+                + "\n".join(lines)
+            )
+    return "\n\n".join(parts)
+
+
 @tool(
     args_schema=AnalyzeCodeSchema,
     description="Analyzes code for quality, potential issues, and improvement suggestions.",
@@ -278,7 +613,9 @@ def analyze_code(filePath: str, analysisType: str = "general") -> Dict[str, Any]
     """
 
     # Use the LLM to analyze the code
-    analyzer = client.invoke(input=[HumanMessage(content=prompt)])
+    analyzer = make_llm_call(
+        input=[HumanMessage(content=prompt)], tools=[], stream=False
+    )
 
     raw_content = analyzer.content.strip()
     json_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", raw_content, re.DOTALL)
@@ -304,5 +641,6 @@ available_tools = {
     "edit_file": edit_file,
     "read_file": read_file,
     "get_codebase_content": get_codebase_content,
+    "get_definitions": get_definitions,
     "analyze_code": analyze_code,
 }
@@ -0,0 +1,272 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+# Empty values disable the trace file / metrics file / metrics endpoint
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+METRICS_PATH = os.getenv("METRICS_PATH", ".cache/metrics.prom")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# The trace file is moved to TRACE_PATH.1 once it grows past this size
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Minimum seconds between two rewrites of the metrics file
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "10"))
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120
+)
+# Span attributes that are also accumulated as counters
+COUNTED = ("input_tokens", "output_tokens", "bytes_read", "bytes_written")
+
+
+class Span:
+    def __init__(
+        self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]
+    ):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.session_id = attributes.pop("session_id", None) or (
+            parent.session_id if parent else None
+        )
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = 0.0
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "session_id": self.session_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Metrics:
+    """Span latency histograms and counters, rendered as Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.totals: Dict[tuple, float] = defaultdict(float)
+        self.sessions: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+
+    def record(self, span: Span):
+        with self._lock:
+            self.latency[span.name].observe(span.duration)
+            for key in COUNTED:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    self.totals[(key, span.name)] += value
+
+    def count(self, session_id: Optional[str], counter: str, amount: float = 1):
+        with self._lock:
+            self.sessions[session_id or "default"][counter] += amount
+
+    def session(self, session_id: Optional[str]) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.sessions.get(session_id or "default", {}))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# TYPE agent_span_duration_seconds histogram")
+            metric = "agent_span_duration_seconds"
+            for name, hist in sorted(self.latency.items()):
+                label = f'span="{name}"'
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {hist.count}')
+                lines.append(f"{metric}_sum{{{label}}} {hist.total}")
+                lines.append(f"{metric}_count{{{label}}} {hist.count}")
+            for key in COUNTED:
+                lines.append(f"# TYPE agent_{key}_total counter")
+                for (total_key, name), value in sorted(self.totals.items()):
+                    if total_key == key:
+                        lines.append(f'agent_{key}_total{{span="{name}"}} {value}')
+            lines.append("# TYPE agent_session_events_total counter")
+            for session_id, counters in sorted(self.sessions.items()):
+                for counter, value in sorted(counters.items()):
+                    lines.append(
+                        f'agent_session_events_total{{session="{session_id}",'
+                        f'counter="{counter}"}} {value}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+_trace_lock = threading.Lock()
+_trace_file = None
+_metrics_written = 0.0
+
+
+def _open_trace():
+    global _trace_file
+    directory = os.path.dirname(TRACE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Line buffered so readers of the file see whole spans
+    _trace_file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)
+
+
+def _write_trace(span: Span):
+    if not TRACE_PATH:
+        return
+    line = json.dumps(span.to_dict(), default=str)
+    with _trace_lock:
+        if _trace_file is None:
+            _open_trace()
+        _trace_file.write(line + "\n")
+        if TRACE_MAX_BYTES and _trace_file.tell() >= TRACE_MAX_BYTES:
+            _trace_file.close()
+            os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+            _open_trace()
+
+
+def close_trace():
+    global _trace_file
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def write_metrics(path: str = METRICS_PATH):
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(metrics.render())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span"""
+    parent = _current.get()
+    current = Span(name, parent, attributes)
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as error:
+        current.set(error=type(error).__name__)
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current.reset(token)
+        metrics.record(current)
+        _write_trace(current)
+        if parent is None:
+            _throttled_write_metrics()
+
+
+def _throttled_write_metrics():
+    global _metrics_written
+    now = time.monotonic()
+    if now - _metrics_written < METRICS_INTERVAL:
+        return
+    _metrics_written = now
+    write_metrics()
+
+
+@atexit.register
+def _flush():
+    close_trace()
+    if _metrics_written:
+        # Spans since the last throttled write
+        write_metrics()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attributes: Any):
+    """Set attributes on the current span, if any"""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def add(key: str, amount: float):
+    """Accumulate a numeric attribute (bytes, tokens) on the current span"""
+    current = _current.get()
+    if current is not None:
+        current.add(key, amount)
+
+
+def count(counter: str, amount: float = 1):
+    """Bump a counter of the current span's session"""
+    current = _current.get()
+    metrics.count(current.session_id if current else None, counter, amount)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics on `port` from a daemon thread (once per process)"""
+    global _server
+    if not port or _server is not None:
+        return
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics endpoint not started on port {port}: {e}")
+        return
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
@@ -0,0 +1,335 @@
+import heapq
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from walker import WALK_WORKERS, DirScan, IgnoreMatcher, child_rel, scan_dir, walk
+
+# How long (seconds) a validated snapshot is trusted before directory mtimes
+# are checked again. Writes made through edit_file are applied immediately.
+REFRESH_INTERVAL = float(os.getenv("TREE_INDEX_REFRESH_INTERVAL", "2.0"))
+
+# Recently written files are kept expanded in budgeted renderings
+RECENT_WRITES = 20
+
+
+class TreeIndex:
+    """In-memory snapshot of a project tree, refreshed per directory by mtime"""
+
+    def __init__(
+        self,
+        root: str,
+        refresh_interval: float = REFRESH_INTERVAL,
+        workers: int = WALK_WORKERS,
+    ):
+        self.root = os.path.normpath(root)
+        self.refresh_interval = refresh_interval
+        self.workers = workers
+        self._base_matcher = IgnoreMatcher()
+        self._dirs: Dict[str, DirScan] = {}
+        self._dirty: Set[str] = set()
+        self._rendered: Optional[str] = None
+        self._budgeted: Optional[Tuple[tuple, str]] = None
+        self._file_counts: Optional[Dict[str, int]] = None
+        self._recent: deque = deque(maxlen=RECENT_WRITES)
+        self._validated_at = 0.0
+        self._lock = threading.RLock()
+
+    def _scan(self, path: str):
+        """Re-list `path` and index any sub-directory not already indexed"""
+        old = self._dirs.get(path)
+        if path == self.root:
+            rel, matcher = "", self._base_matcher
+        else:
+            parent = self._dirs.get(os.path.dirname(path))
+            if parent is None:
+                return
+            rel = child_rel(parent.rel, os.path.basename(path))
+            matcher = parent.matcher
+
+        try:
+            scan = scan_dir(path, rel, matcher)
+        except OSError:
+            self._drop(path)
+            return
+
+        self._invalidate()
+        if old is not None and old.matcher.rules != scan.matcher.rules:
+            # Ignore rules changed, nothing below this folder can be trusted
+            self._drop(path)
+            self._dirs.update(walk(path, matcher, rel, self.workers))
+            return
+
+        self._dirs[path] = scan
+        child_dirs = {name for name, is_dir in scan.entries if is_dir}
+        if old is not None:
+            for name, is_dir in old.entries:
+                if is_dir and name not in child_dirs:
+                    self._drop(os.path.join(path, name))
+
+        for name in sorted(child_dirs):
+            child = os.path.join(path, name)
+            if child not in self._dirs:
+                self._dirs.update(
+                    walk(child, scan.matcher, child_rel(rel, name), self.workers)
+                )
+
+    def _invalidate(self):
+        self._rendered = None
+        self._budgeted = None
+        self._file_counts = None
+
+    def _drop(self, path: str):
+        """Forget `path` and everything indexed below it"""
+        prefix = path + os.sep
+        for key in [k for k in self._dirs if k == path or k.startswith(prefix)]:
+            del self._dirs[key]
+        self._invalidate()
+
+    def refresh(self, force: bool = False):
+        """Re-scan directories that were written to or whose mtime changed"""
+        with self._lock:
+            if not self._dirs:
+                self._dirs = walk(self.root, self._base_matcher, "", self.workers)
+                self._invalidate()
+                self._dirty.clear()
+                self._validated_at = time.monotonic()
+                return
+
+            stale = set(self._dirty)
+            self._dirty.clear()
+
+            now = time.monotonic()
+            if force or now - self._validated_at >= self.refresh_interval:
+                for path, scan in list(self._dirs.items()):
+                    try:
+                        if os.stat(path).st_mtime_ns != scan.mtime:
+                            stale.add(path)
+                    except OSError:
+                        stale.add(path)
+                self._validated_at = now
+
+            # Parents first, so removed sub-trees are dropped before re-scanning
+            for path in sorted(stale, key=len):
+                if path in self._dirs or path == self.root:
+                    self._scan(path)
+
+    def note_write(self, file_path: str):
+        """Record that `file_path` was created or modified"""
+        with self._lock:
+            file_path = os.path.normpath(file_path)
+            if file_path in self._recent:
+                self._recent.remove(file_path)
+            self._recent.append(file_path)
+            self._budgeted = None
+
+            directory = os.path.dirname(file_path)
+            # Walk up to the closest directory we already know about, new
+            # intermediate folders are then picked up by its re-scan.
+            while directory not in self._dirs and directory != self.root:
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    return
+                directory = parent
+            self._dirty.add(directory)
+
+    def render(self) -> str:
+        """Return the tree as text, re-using the cached rendering when possible"""
+        with self._lock:
+            self.refresh()
+            if self._rendered is None:
+                lines: List[str] = []
+                self._render_dir(self.root, "", lines)
+                self._rendered = "".join(lines)
+            return self._rendered
+
+    def _render_dir(self, path: str, prefix: str, lines: List[str]):
+        scan = self._dirs.get(path)
+        entries = scan.entries if scan else []
+        last_index = len(entries) - 1
+        for index, (name, is_dir) in enumerate(entries):
+            is_last = index == last_index
+            lines.append(prefix + ("└── " if is_last else "├── ") + name + "\n")
+            if is_dir:
+                new_prefix = prefix + ("    " if is_last else "│   ")
+                self._render_dir(os.path.join(path, name), new_prefix, lines)
+
+    def files(self, extensions: Optional[Tuple[str, ...]] = None) -> Dict[str, str]:
+        """Indexed files as {full path: "/" separated relative path}"""
+        with self._lock:
+            self.refresh()
+            found = {}
+            for path, scan in self._dirs.items():
+                for name, is_dir in scan.entries:
+                    if is_dir or (extensions and not name.endswith(extensions)):
+                        continue
+                    found[os.path.join(path, name)] = child_rel(scan.rel, name)
+            return found
+
+    def file_counts(self) -> Dict[str, int]:
+        """Number of (non-ignored) files below each indexed directory"""
+        if self._file_counts is None:
+            counts: Dict[str, int] = {}
+            # Deepest directories first so children are counted before parents
+            by_depth = sorted(self._dirs, key=lambda p: p.count(os.sep), reverse=True)
+            for path in by_depth:
+                total = 0
+                for name, is_dir in self._dirs[path].entries:
+                    total += counts.get(os.path.join(path, name), 0) if is_dir else 1
+                counts[path] = total
+            self._file_counts = counts
+        return self._file_counts
+
+    def focus_dirs(self, query: Optional[str], paths: Iterable[str] = ()) -> Set[str]:
+        """Directories on the way to recent edits, `paths` or names matching `query`"""
+        targets = [os.path.join(self.root, p) for p in paths]
+        targets.extend(self._recent)
+
+        words = re.findall(r"[a-z0-9]+", (query or "").lower())
+        terms = {word for word in words if len(word) > 2}
+        if terms:
+            for path, scan in self._dirs.items():
+                for name, _ in scan.entries:
+                    lowered = name.lower()
+                    if any(term in lowered for term in terms):
+                        targets.append(os.path.join(path, name))
+
+        focus: Set[str] = set()
+        for target in targets:
+            directory = os.path.normpath(target)
+            if directory not in self._dirs:
+                directory = os.path.dirname(directory)
+            while directory not in focus and (
+                directory == self.root or directory.startswith(self.root + os.sep)
+            ):
+                focus.add(directory)
+                if directory == self.root:
+                    break
+                directory = os.path.dirname(directory)
+        return focus
+
+    def render_budgeted(
+        self,
+        max_chars: int,
+        max_depth: Optional[int] = None,
+        query: Optional[str] = None,
+        paths: Iterable[str] = (),
+    ) -> str:
+        """Render at most `max_chars`, collapsing folders into "name/ (N files)"
+
+        Folders are expanded breadth-first while they fit, folders leading to
+        `paths`, recently written files or names matching `query` go first and
+        may exceed `max_depth`.
+        """
+        with self._lock:
+            self.refresh()
+            paths = tuple(paths)
+            key = (max_chars, max_depth, query, paths, tuple(self._recent))
+            if self._budgeted is not None and self._budgeted[0] == key:
+                return self._budgeted[1]
+            if self.root not in self._dirs:
+                # Root missing or unreadable, same as render()
+                return ""
+
+            counts = self.file_counts()
+            focus = self.focus_dirs(query, paths)
+
+            def listing_cost(path: str, depth: int) -> int:
+                cost = 0
+                for name, is_dir in self._dirs[path].entries:
+                    cost += 4 * depth + 5 + len(name)
+                    if is_dir:
+                        cost += 1 + len(self._collapsed_suffix(counts, path, name))
+                return cost
+
+            def push_children(path: str, depth: int):
+                for name, is_dir in self._dirs[path].entries:
+                    child = os.path.join(path, name)
+                    if is_dir and child in self._dirs:
+                        rank = 0 if child in focus else 1
+                        item = (rank, depth, counts[child], child)
+                        heapq.heappush(candidates, item)
+
+            expanded = {self.root}
+            used = listing_cost(self.root, 0)
+            candidates: List[Tuple[int, int, int, str]] = []
+            push_children(self.root, 1)
+            while candidates:
+                rank, depth, _, path = heapq.heappop(candidates)
+                if rank and max_depth is not None and depth >= max_depth:
+                    continue
+                parent = os.path.dirname(path)
+                delta = listing_cost(path, depth) - len(
+                    self._collapsed_suffix(counts, parent, os.path.basename(path))
+                )
+                if used + delta > max_chars:
+                    continue
+                used += delta
+                expanded.add(path)
+                push_children(path, depth + 1)
+
+            lines: List[str] = []
+            self._render_collapsed(self.root, "", lines, expanded, counts)
+            text = "".join(lines)
+            if len(text) > max_chars:
+                cut = text.rfind("\n", 0, max_chars) + 1
+                hidden = text.count("\n", cut)
+                text = text[:cut] + f"... ({hidden} more entries)\n"
+
+            self._budgeted = (key, text)
+            return text
+
+    @staticmethod
+    def _collapsed_suffix(counts: Dict[str, int], path: str, name: str) -> str:
+        return f" ({counts.get(os.path.join(path, name), 0)} files)"
+
+    def _render_collapsed(
+        self,
+        path: str,
+        prefix: str,
+        lines: List[str],
+        expanded: Set[str],
+        counts: Dict[str, int],
+    ):
+        entries = self._dirs[path].entries
+        last_index = len(entries) - 1
+        for index, (name, is_dir) in enumerate(entries):
+            is_last = index == last_index
+            line = prefix + ("└── " if is_last else "├── ") + name
+            child = os.path.join(path, name)
+            if not is_dir:
+                lines.append(line + "\n")
+            elif child in expanded:
+                lines.append(line + "/\n")
+                new_prefix = prefix + ("    " if is_last else "│   ")
+                self._render_collapsed(child, new_prefix, lines, expanded, counts)
+            else:
+                suffix = self._collapsed_suffix(counts, path, name)
+                lines.append(line + "/" + suffix + "\n")
+
+
+_indexes: Dict[str, TreeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_tree_index(root: str) -> TreeIndex:
+    """Return the shared index for `root`, creating it on first use"""
+    key = os.path.normpath(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TreeIndex(key)
+        return index
+
+
+def note_write(file_path: str):
+    """Forward a file write to every index whose root contains the file"""
+    path = os.path.normpath(file_path)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if path.startswith(index.root + os.sep):
+            index.note_write(path)
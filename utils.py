@@ -1,54 +1,159 @@
 import os
 from langchain_core.language_models import LanguageModelInput
-from typing import Callable, Sequence, Any
-from google.ai.generativelanguage_v1beta.types import (
-    Tool as GoogleTool,
-)
+from typing import TYPE_CHECKING, Callable, Sequence, Any, Union
 from langchain_core.tools import BaseTool
-from config import client
-from langchain_core.messages import BaseMessage
+from config import (
+    get_agent_client,
+    WORKSPACE_ROOT,
+    TREE_TOKEN_BUDGET,
+    TREE_MAX_DEPTH,
+    SEARCH_TOP_K,
+)
+from langchain_core.messages import AIMessage, BaseMessage
+from events import emit
+from llm_cache import llm_cache, model_params, request_key
+from checkpoint import current_steps
+from tracing import annotate, count, span
+from tree_index import get_tree_index
+from search_index import get_search_index
+
+if TYPE_CHECKING:
+    # Only for the annotation, the protobuf types are slow to import
+    from google.ai.generativelanguage_v1beta.types import Tool as GoogleTool
 
-IGNORED = {
-    "node_modules",
-    ".git",
-    "__pycache__",
-    ".next",
-}  # Add folders/files to ignore
+STREAM_LLM = os.getenv("STREAM_LLM", "1") != "0"
+CHARS_PER_TOKEN = 4  # rough average for code and paths
 
 
-def get_tree(directory, prefix=""):
-    tree_str = ""
-    items = sorted(os.listdir(directory))
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
 
-    for index, item in enumerate(items):
-        if item in IGNORED:  # Skip ignored items
-            continue
 
-        path = os.path.join(directory, item)
-        is_last = index == len(items) - 1
-        connector = "└── " if is_last else "├── "
+def get_tree(directory=None, query=None, token_budget=TREE_TOKEN_BUDGET):
+    """Render the project tree from the cached index of `directory`
 
-        tree_str += prefix + connector + item + "\n"
+    With a `token_budget` large folders are collapsed into "name/ (N files)"
+    summaries, folders matching `query` or recently edited stay expanded.
+    """
+    with span("get_tree", token_budget=token_budget):
+        index = get_tree_index(directory or WORKSPACE_ROOT)
+        if not token_budget:
+            return index.render()
+        return index.render_budgeted(
+            max_chars=token_budget * CHARS_PER_TOKEN,
+            max_depth=TREE_MAX_DEPTH,
+            query=query,
+        )
 
-        if os.path.isdir(path):  # If it's a folder, recurse
-            new_prefix = prefix + ("    " if is_last else "│   ")
-            tree_str += get_tree(path, new_prefix)
 
-    return tree_str
+def search_snippets(query: str, k: int = SEARCH_TOP_K, directory=None) -> str:
+    """Best matching snippets of the `k` files most relevant to `query` (BM25)"""
+    if not k or not query:
+        return ""
+    with span("search_snippets", k=k):
+        return get_search_index(directory or WORKSPACE_ROOT).snippets(query, k)
 
 
 tools_type = Sequence[
-    dict[str, Any] | type | Callable[..., Any] | BaseTool | GoogleTool
+    Union[dict[str, Any], type, Callable[..., Any], BaseTool, "GoogleTool"]
 ]
 
 
-def make_llm_call(input: LanguageModelInput, tools: tools_type) -> BaseMessage:
-    agent = client
-    if tools:
-        agent = client.bind_tools(tools)
-    response = agent.invoke(input)
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "") for part in content
+        )
+    return content or ""
+
+
+def _input_tokens(input: LanguageModelInput) -> int:
+    if isinstance(input, str):
+        return estimate_tokens(input)
+    return sum(estimate_tokens(_text(getattr(m, "content", m))) for m in input)
+
+
+def make_llm_call(
+    input: LanguageModelInput, tools: tools_type, stream: bool = STREAM_LLM
+) -> BaseMessage:
+    with span("llm_call", tools=len(tools or []), stream=stream) as current:
+        count("llm_calls")
+        response = _call_llm(input, tools, stream)
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        current.set(
+            input_tokens=usage.get("input_tokens") or _input_tokens(input),
+            output_tokens=usage.get("output_tokens")
+            or estimate_tokens(_text(response.content)),
+        )
+        return response
+
+
+def _emit_whole(response: BaseMessage):
+    emit("llm_start")
+    emit("token", text=_text(response.content))
+    emit("llm_end")
+
+
+def _step_key(tools: tools_type) -> str:
+    """Names of the bound tools, tells the agent's calls from the builder's"""
+    return ",".join(sorted(getattr(t, "name", None) or str(t) for t in tools or []))
+
+
+def _call_llm(
+    input: LanguageModelInput, tools: tools_type, stream: bool
+) -> BaseMessage:
+    client = get_agent_client()
+    key = None
+    if llm_cache.enabled:
+        key = request_key(input, tools, model_params(client.model))
+
+    # A node re-run after an interruption gets the responses it already paid
+    # for. Calls are matched by order per tool set, not by prompt: prompts
+    # embed state that is not the same after a restart (e.g. the tree focus).
+    seq = 0
+    steps = current_steps()
+    step_key = _step_key(tools)
+    if steps is not None:
+        seq, replayed = steps.replay(step_key)
+        annotate(replayed=replayed is not None)
+        if replayed is not None:
+            if stream:
+                _emit_whole(replayed)
+            return replayed
+
+    if llm_cache.enabled:
+        cached = llm_cache.get(key)
+        annotate(cached=cached is not None)
+        if cached is not None:
+            if stream:
+                _emit_whole(cached)
+            return cached
+
+    if stream:
+        # Forward tokens to the UI as they arrive, the merged chunks carry
+        # the same content and tool calls as a blocking call would
+        emit("llm_start")
+        response = None
+        for chunk in client.stream(input, tools):
+            text = _text(chunk.content)
+            if text:
+                emit("token", text=text)
+            response = chunk if response is None else response + chunk
+        emit("llm_end")
+        if response is None:
+            response = AIMessage(content="")
+    else:
+        response = client.invoke(input, tools)
 
     if isinstance(response.content, list):
-        response.content = "\n".join(response.content)
+        response.content = "\n".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in response.content
+        )
 
+    if llm_cache.enabled:
+        llm_cache.put(key, response)
+    if steps is not None:
+        steps.record(step_key, seq, response)
     return response
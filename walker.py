@@ -0,0 +1,238 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Always skipped, whatever the ignore files say
+IGNORED = {
+    "node_modules",
+    ".git",
+    "__pycache__",
+    ".next",
+    ".agent-journal",  # overlay commit journals
+}
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+WALK_WORKERS = int(
+    os.getenv("WALK_WORKERS", str(min(8, (os.cpu_count() or 1) * 2)))
+)
+
+Entry = Tuple[str, bool]  # (name, is_dir)
+
+
+class IgnoreRule(NamedTuple):
+    pattern: str
+    base: str  # directory of the ignore file, relative to the walk root
+    negate: bool
+    dir_only: bool
+
+
+def _glob_to_regex(pattern: str) -> str:
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def compile_rule(rule: IgnoreRule) -> str:
+    """Translate one gitignore rule into a regex over root-relative paths"""
+    pattern = rule.pattern
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    base = re.escape(rule.base + "/") if rule.base else ""
+    body = _glob_to_regex(pattern)
+    if anchored:
+        return f"{base}{body}"
+    return f"{base}(?:.*/)?{body}"
+
+
+def parse_ignore_file(path: str, base: str) -> List[IgnoreRule]:
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if line:
+            rules.append(IgnoreRule(line, base, negate, dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """Compiled .gitignore/.ignore rules, last matching rule wins"""
+
+    def __init__(self, rules: Tuple[IgnoreRule, ...] = ()):
+        self.rules = rules
+        self._compiled = [
+            (re.compile(compile_rule(rule), re.DOTALL), rule.negate, rule.dir_only)
+            for rule in rules
+        ]
+        # Without negations one alternation per kind answers every lookup
+        self._simple = not any(rule.negate for rule in rules)
+        if self._simple:
+            self._any = self._join([r for r in rules if not r.dir_only])
+            self._dirs = self._join(rules)
+
+    @staticmethod
+    def _join(rules) -> Optional["re.Pattern[str]"]:
+        if not rules:
+            return None
+        joined = "|".join(f"(?:{compile_rule(rule)})" for rule in rules)
+        return re.compile(joined, re.DOTALL)
+
+    def extend(self, rules: List[IgnoreRule]) -> "IgnoreMatcher":
+        if not rules:
+            return self
+        return IgnoreMatcher(self.rules + tuple(rules))
+
+    def is_ignored(self, name: str, rel_path: str, is_dir: bool) -> bool:
+        if name in IGNORED:
+            return True
+        if self._simple:
+            regex = self._dirs if is_dir else self._any
+            return bool(regex and regex.fullmatch(rel_path))
+        for regex, negate, dir_only in reversed(self._compiled):
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not negate
+        return False
+
+
+class DirScan(NamedTuple):
+    path: str
+    rel: str  # relative to the walk root, "/" separated, "" for the root
+    mtime: int
+    entries: List[Entry]
+    matcher: IgnoreMatcher  # rules in effect for this directory's entries
+
+
+def child_rel(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+def scan_dir(path: str, rel: str, matcher: IgnoreMatcher) -> DirScan:
+    """List one directory with a single scandir pass, applying ignore rules"""
+    raw: List[Entry] = []
+    ignore_files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                # Symlinked folders are listed but not entered, they may loop
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            raw.append((entry.name, is_dir))
+            if entry.name in IGNORE_FILES and not is_dir:
+                ignore_files.append(entry.name)
+    mtime = os.stat(path).st_mtime_ns
+
+    for name in sorted(ignore_files):
+        matcher = matcher.extend(parse_ignore_file(os.path.join(path, name), rel))
+
+    entries = [
+        (name, is_dir)
+        for name, is_dir in sorted(raw)
+        if not matcher.is_ignored(name, child_rel(rel, name), is_dir)
+    ]
+    return DirScan(path, rel, mtime, entries, matcher)
+
+
+def walk(
+    root: str,
+    matcher: Optional[IgnoreMatcher] = None,
+    rel: str = "",
+    workers: int = WALK_WORKERS,
+) -> Dict[str, DirScan]:
+    """Scan `root` recursively, fanning sub-directories out over `workers` threads"""
+    root = os.path.normpath(root)
+    matcher = matcher or IgnoreMatcher()
+    results: Dict[str, DirScan] = {}
+
+    def children(scan: DirScan):
+        for name, is_dir in scan.entries:
+            if is_dir:
+                path = os.path.join(scan.path, name)
+                yield path, child_rel(scan.rel, name), scan.matcher
+
+    def safe_scan(path, child_rel_path, child_matcher):
+        try:
+            return scan_dir(path, child_rel_path, child_matcher)
+        except OSError:
+            return None
+
+    def walk_serial(path, path_rel, path_matcher):
+        found = {}
+        stack = [(path, path_rel, path_matcher)]
+        while stack:
+            scan = safe_scan(*stack.pop())
+            if scan is not None:
+                found[scan.path] = scan
+                stack.extend(children(scan))
+        return found
+
+    if workers <= 1:
+        return walk_serial(root, rel, matcher)
+
+    # Expand breadth-first until there are enough independent sub-trees to keep
+    # every worker busy, then hand each sub-tree to a worker as a serial walk.
+    frontier = [(root, rel, matcher)]
+    while frontier and len(frontier) < workers * 4:
+        next_frontier = []
+        for args in frontier:
+            scan = safe_scan(*args)
+            if scan is not None:
+                results[scan.path] = scan
+                next_frontier.extend(children(scan))
+        frontier = next_frontier
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(lambda args: walk_serial(*args), frontier):
+            results.update(found)
+    return results